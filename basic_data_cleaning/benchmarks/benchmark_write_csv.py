@@ -0,0 +1,78 @@
+"""Compare the peak memory of the csv export of save_panel with the former path.
+
+Before write_csv, the object columns were cleaned on a deep copy of the panel
+which was then written with a single DataFrame.to_csv. Run from
+basic_data_cleaning with
+
+    python benchmarks/benchmark_write_csv.py
+
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from liss_data.utils_liss_data import write_csv  # noqa: E402
+
+
+def make_panel(n_rows=100000, n_text=10, n_float=40, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_arrays(
+        [np.arange(n_rows), rng.choice([2019, 2020], n_rows)],
+        names=["personal_id", "year"],
+    )
+    df = pd.DataFrame(rng.random((n_rows, n_float)), index=index).add_prefix("x")
+    for i in range(n_text):
+        df[f"text_{i}"] = np.where(
+            rng.random(n_rows) < 0.3, "a free; text\nanswer of someone", None
+        )
+    return df
+
+
+def export_before(panel, path):
+    panel = panel.copy()
+    for c in panel.select_dtypes(include=["object"]).columns:
+        panel[c] = panel[c].replace("\n", " ", regex=True)
+        panel[c] = panel[c].replace("\r", " ", regex=True)
+        panel[c] = panel[c].replace(";", ",", regex=True)
+    panel.to_csv(path, sep=";")
+
+
+def export_now(panel, path):
+    write_csv(panel, path, sep=";")
+
+
+def measure(func, panel, path):
+    """Return the duration in s and the traced peak memory in MB of *func*.
+
+    The duration is measured without tracing the memory which slows down the
+    export considerably.
+
+    """
+    start = time.perf_counter()
+    func(panel, path)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(panel, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak / 2**20
+
+
+if __name__ == "__main__":
+    panel = make_panel()
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in [("before", export_before), ("write_csv", export_now)]:
+            duration, peak = measure(func, panel, Path(tmp) / f"{name}.csv")
+            print(f"{name:>10}: peak memory {peak:8.1f} MB, {duration:6.1f} s")
+        same = (Path(tmp) / "before.csv").read_bytes() == (
+            Path(tmp) / "write_csv.csv"
+        ).read_bytes()
+        print(f"identical output: {same}")
@@ -11,9 +11,22 @@ IN_SPECS_LISS = ROOT / "liss_data_specs"
 OUT_DATA_LISS = OUT / "data" / "liss-data"
 OUT_DATA_CORONA_PREP = OUT / "data" / "liss-prep"
 OUT_TESTS = ROOT / "regression_test_files"
+OUT_SPECS_CACHE = OUT / "specs_cache"
+OUT_FILES_CACHE = OUT / "files_cache"
 # define file format as one of "pickle", "dta", "csv", "parquet"
 FILE_FORMATS_LISS = ["pickle"]
 
+# Format in which later stages load the data sets, either "pickle" or "parquet".
+# With "parquet" only the requested columns and rows are read. It has to be in
+# FILE_FORMATS_LISS.
+INTERCHANGE_FORMAT = "pickle"
+
+# Number of worker processes used to clean the LISS data sets. With more than one
+# worker, all data sets are cleaned in a single task that runs them concurrently
+# without exceeding the memory limit (in GB).
+N_WORKERS_LISS = 1
+MEMORY_LIMIT_GB_LISS = 16
+
 # "Prepare several additional files used for CoViD-19-Impact research.
 # These files are installed in liss-data-covid-19/"
 CORONA_PREP_LISS = True
@@ -84,24 +84,24 @@ cutoffs_low_missing_2019 = {
 }
 
 
-def get_baseline(df, newvar, oldvar, baseline="2020-02-01"):
-    """Generate variable that contains before Covid values for all periods.
-    Example: want to have variable that contains hours_total from before
+def get_baselines(df, variables, baseline="2020-02-01"):
+    """Generate variables that contain before Covid values for all periods.
+    Example: want to have variables that contain hours_total from before
              Covid-19 at all points in time.
     Args:
         df (pd.DataFrame)
-        newvar (str): name of the variable to be generated
-        oldvar (str): name of the variable out of which the new variable
-                      shall be generated.
+        variables (list): variables out of which the new variables with suffix
+                          "_baseline" shall be generated.
         baseline (str): data of the baseline
     Return:
-        original dataframe + newvar
+        original dataframe + new variables
     """
     base = df.index.get_level_values("month") == baseline
-    var = df.loc[base, oldvar].reset_index().set_index("personal_id").copy()
-    var.rename(columns={oldvar: newvar}, inplace=True)
-    var = var[newvar].copy()
-    return df.join(var)
+    values = df.loc[base, variables].droplevel("month")
+    values = values.reindex(df.index.get_level_values("personal_id"))
+    values.index = df.index
+    values.columns = [var + "_baseline" for var in variables]
+    return pd.concat([df, values], axis=1)
 
 
 def reindex_time_use(time_use, month):
@@ -120,187 +120,221 @@ def reindex_time_use(time_use, month):
     return time_use
 
 
-def is_systematically_incomplete(row, hour_cols, exceptions):
-    """Check whether observation only filled in part of the hours.
+def is_systematically_incomplete(data, hour_cols, exceptions):
+    """Check whether observations only filled in part of the hours.
 
-    Returns:
-        - False, 0 if all columns (except exceptions) are non-missing,
-        - False and some number > 0, if some columns are missing, but not in
-            not in the order they were asked.
-        - True and some number > 0, if the first column that is missing is
-            followed by all mising columns.
+    For each row the result is
+
+        - False, 0 missings if all columns (except exceptions) are non-missing,
+        - False and some number > 0 of missings, if some columns are missing,
+            but not in the order they were asked.
+        - True and some number > 0 of missings, if the first column that is
+            missing is followed by all mising columns.
 
     Args:
-        row of data frame
+        data (pd.DataFrame): data containing hour_cols
         hour_cols (list): hour columns that were filled out in
                           the respective year in their correct order.
         exceptions (list): subset of hour_cols that was not filled out be
                            everyone
 
     Return:
-        list:
-            boolean: systematically incomplete?,
-            float: number of non-missing columns
+        pd.DataFrame: with the columns
+
+            systematically_incomplete (boolean): systematically incomplete?
+            number_non_missing (float): len(hour_cols) - number of missing
+                columns that are not exceptions
 
     """
-    row = row.copy()
     colus = [hrs for hrs in hour_cols if hrs not in exceptions]
+    missing = data[colus].isna().to_numpy()
+    number_missing = missing.sum(axis=1)
+
+    # The first missing is followed by all missing if the missing columns are
+    # exactly the ones from the first missing column on
+    first_missing = missing.argmax(axis=1)
+    systematically_incomplete = (number_missing > 0) & (
+        number_missing == len(colus) - first_missing
+    )
 
-    # Get all missing columns that are not supposed to be missing
-    missing_cols = [c for c in colus if np.isnan(row[c])]
-
-    # Generate output variables
-    systematically_incomplete = False
-    number_missing = len(missing_cols)
-
-    # Check whether the first missing is followed by all missing
-    if len(missing_cols) != 0:
-        # Get the first column that is missing
-        first_missing = missing_cols[0]
-
-        # Get the columns following the first missing incl. the first missing
-        ind = colus.index(first_missing)
-        num_total_colus = len(colus)
-        following_colus = colus[ind:num_total_colus]
-
-        # If all following the first missing are missing, then they are syst
-        # missing
-        if following_colus == missing_cols:
-            systematically_incomplete = True
-
-    return systematically_incomplete, len(hour_cols) - number_missing
+    return pd.DataFrame(
+        {
+            "systematically_incomplete": systematically_incomplete,
+            "number_non_missing": (len(hour_cols) - number_missing).astype(float),
+        },
+        index=data.index,
+    )
 
 
-def replace_maximum_with_nan(row):
-    """Replace the hrs column with the highest value with missing.
+def replace_maximum_with_nan(data):
+    """Replace the hrs column with the highest value in each row with missing.
 
     Args:
-        row (pd.Series): row of data with hours columns already selected
+        data (pd.DataFrame): data with hours columns already selected
 
     Return:
-        row with new values
+        data with new values, rows with only missing values are unchanged
 
     """
-    row = row.copy()
-    argm = row.idxmax()
-    row[argm] = np.nan
+    values = data.to_numpy(dtype=float, copy=True)
+    observed = ~np.isnan(values).all(axis=1)
+    argm = np.where(np.isnan(values), -np.inf, values).argmax(axis=1)
+    values[observed, argm[observed]] = np.nan
 
-    return row
+    return pd.DataFrame(values, index=data.index, columns=data.columns)
 
 
-def winsorize_outlier(data, hour_dict):
-    """Winsorize values according to hour_dict.
+def clean_hours_vars(data, hour_dict):
+    """Cleaning according to single column cutoffs.
+
+    The hour columns are cleaned as a matrix in the following steps:
+
+        1. Set all hours to missing for extreme outliers in any column.
+        2. Winsorize each column, rescaling the other columns of the
+           winsorized rows to the remaining hours of the week.
+        3. Rescale all hours such that they sum up to 168.
+        4. Set all hours to missing if a column is again above its
+           winsorize cutoff.
 
     Args:
-        data (pd.DataFrame)
+        data (pd.DataFrame): data of one month
         hour_dict (dict): keys are column names values, are lists of at least
                           length 2 containing cutoff values of column
 
     Return:
-        data winsorized according to hour_dict.
+        data with cleaned hours columns, imputation flags and total hours
 
     """
     data = data.copy()
+    hour_cols = [*hour_dict]
+    month = _month_label(data)
 
-    for hrs, cutoffs in hour_dict.items():
+    values = data[hour_cols].to_numpy(dtype=float, copy=True)
+    rescaled = np.zeros(len(data), dtype=bool)
 
-        lower = cutoffs[0]
-        upper = cutoffs[1]
+    # Too high values in variables
+    upper_extreme = [max(cutoffs) for cutoffs in hour_dict.values()]
+    _remove_extreme_outliers(values, hour_cols, upper_extreme, month)
 
-        assert lower < upper, "lower bound is larger than upper bound"
+    # Winsorize medium extreme values
+    imputed = _winsorize_outliers(values, rescaled, hour_dict, month)
 
-        lower_bound = data[hrs] < lower
-        upper_bound = data[hrs] > upper
-        either = lower_bound | upper_bound
+    # Rescaling
+    tot_hours = _rescale(values, rescaled, np.arange(len(hour_cols)))
 
-        data.loc[lower_bound, hrs] = lower
-        data.loc[upper_bound, hrs] = upper
+    # Drop those that are again over the cutoff, but use winsorize cutoff
+    upper_winsorize = [cutoffs[1] for cutoffs in hour_dict.values()]
+    _remove_extreme_outliers(values, hour_cols, upper_winsorize, month)
 
-        # Rescale all other columns
-        other_hours = [col for col in hour_dict.keys() if col != hrs]
-        rescaled = rescaling(data, other_hours, sum_hours=168 - upper)
-        data.loc[upper_bound, other_hours + ["rescaled_hrs"]] = rescaled.loc[
-            upper_bound, other_hours + ["rescaled_hrs"]
-        ]
+    for j, hrs in enumerate(hour_cols):
+        data[hrs] = values[:, j]
+    data["rescaled_hrs"] = rescaled
+    for hrs in hour_cols:
+        data[hrs + "_imputed"] = imputed[hrs]
+    impute_cols = [hrs + "_imputed" for hrs in hour_cols]
+    data["number_imputed_values_tu"] = data[impute_cols].sum(axis=1)
+    data["tot_hours"] = tot_hours
 
-        # Generate imputation flag
-        data[hrs + "_imputed"] = False
-        data.loc[either, hrs + "_imputed"] = True
-        data[hrs + "_imputed"] = data[hrs + "_imputed"].astype(float)
+    return data
 
-        month = data.reset_index()["month"].unique()[0].astype(str)[0:10]
-        warnings.warn(
-            f"{month}: Winsorize {either.sum()} values"
-            "at {lower} and {upper} hours in column {hrs}"
-        )
 
-    # Calculate the number of imputed values
-    impute_cols = [hrs + "_imputed" for hrs in hour_dict.keys()]
-    data["number_imputed_values_tu"] = data[impute_cols].sum(axis=1)
+def _month_label(data):
+    """Return the month of *data* as YYYY-MM-DD for warnings."""
+    if "month" in data.index.names:
+        month = data.index.get_level_values("month")[0]
+    else:
+        month = data["month"].iloc[0]
+    return str(pd.Timestamp(month))[0:10]
 
-    return data
 
+def _remove_extreme_outliers(values, hour_cols, upper_bounds, month):
+    """Set all hours to missing if a column is above its upper bound.
 
-def remove_extreme_outlier(data, col, hour_dict, up=True):
-    """Set extrem outlier to missing."""
-    data = data.copy()
-    hour_cols = [*hour_dict]
-    cutoffs = hour_dict[col]
+    The columns are checked in order. *values* is changed in place.
 
-    condition = data[col] > max(cutoffs) if up else data[col] < min(cutoffs)
-    drop = condition.sum()
+    """
+    for j, (col, upper) in enumerate(zip(hour_cols, upper_bounds)):
+        condition = values[:, j] > upper
+        drop = condition.sum()
 
-    if drop > 0:
-        month = data.reset_index()["month"].unique()[0].astype(str)[0:10]
-        warnings.warn(
-            f"{month}: Set {drop} obs to missing because of extreme values in {col}."
-        )
-        for hrs in hour_cols:
-            data.loc[condition, hrs] = np.nan
+        if drop > 0:
+            warnings.warn(
+                f"{month}: Set {drop} obs to missing because of extreme values in {col}."
+            )
+            values[condition] = np.nan
 
-    return data
 
+def _winsorize_outliers(values, rescaled, hour_dict, month):
+    """Winsorize the hour columns in order according to hour_dict.
 
-def rescaling(data, hour_cols, sum_hours=168):
-    """Rescale so that sum of hours is always 168."""
-    data = data.copy()
-    data["tot_hours"] = data[hour_cols].sum(axis=1)
-    data.loc[data[hour_cols].isna().all(axis=1), "tot_hours"] = np.nan
+    The other columns of rows above the upper cutoff are rescaled to the
+    remaining hours of the week. *values* and the flags in *rescaled* are
+    changed in place.
 
-    # Rescaling
-    condition = data.tot_hours != sum_hours
-    data.loc[condition, "rescaled_hrs"] = True
+    Return:
+        dict: imputation flags (float) of each column
 
-    for hrs in hour_cols:
-        data.loc[condition, hrs] = (
-            data.loc[condition, hrs] / data.loc[condition, "tot_hours"] * sum_hours
+    """
+    imputed = {}
+    for j, (hrs, cutoffs) in enumerate(hour_dict.items()):
+
+        lower = cutoffs[0]
+        upper = cutoffs[1]
+
+        assert lower < upper, "lower bound is larger than upper bound"
+
+        lower_bound = values[:, j] < lower
+        upper_bound = values[:, j] > upper
+        either = lower_bound | upper_bound
+
+        values[lower_bound, j] = lower
+        values[upper_bound, j] = upper
+
+        # Rescale all other columns
+        other_hours = [k for k in range(len(hour_dict)) if k != j]
+        sub_values = values[upper_bound]
+        sub_rescaled = rescaled[upper_bound]
+        _rescale(sub_values, sub_rescaled, other_hours, sum_hours=168 - upper)
+        values[upper_bound] = sub_values
+        rescaled[upper_bound] = sub_rescaled
+
+        # Generate imputation flag
+        imputed[hrs] = either.astype(float)
+
+        warnings.warn(
+            f"{month}: Winsorize {either.sum()} values"
+            "at {lower} and {upper} hours in column {hrs}"
         )
 
-    return data
+    return imputed
 
 
-def clean_hours_vars(data, hour_dict):
-    """Cleaning according to single column cutoffs."""
-    data = data.copy()
-    data["rescaled_hrs"] = False
+def _rescale(values, rescaled, cols, sum_hours=168):
+    """Rescale the columns *cols* of *values* so that they sum up to sum_hours.
 
-    # Too high values in variables
-    for hrs in [*hour_dict]:
-        data = remove_extreme_outlier(data, hrs, hour_dict)
+    *values* and the flags in *rescaled* are changed in place.
 
-    # Winsorize medium extreme values
-    data = winsorize_outlier(data, hour_dict)
+    Return:
+        np.ndarray: sum of the columns before rescaling, missing if all are
+            missing
 
-    # Rescaling
-    data = rescaling(data, [*hour_dict])
+    """
+    # Sum as pandas does, the order of summation decides about values exactly
+    # at the cutoffs.
+    tot_hours = pd.DataFrame(values[:, cols]).sum(axis=1).to_numpy()
+    tot_hours[np.isnan(values[:, cols]).all(axis=1)] = np.nan
 
-    # Drop those that are again over the cutoff, but use winsorize cutoff
-    new_hour_dict = {c: hour_dict[c][0:2] for c in hour_dict.keys()}
+    # Rescaling
+    condition = tot_hours != sum_hours
+    rescaled[condition] = True
 
-    for hrs in [*new_hour_dict]:
-        data = remove_extreme_outlier(data, hrs, new_hour_dict)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in cols:
+            values[condition, k] = (
+                values[condition, k] / tot_hours[condition] * sum_hours
+            )
 
-    return data
+    return tot_hours
 
 
 def generate_additional_variables(data):
@@ -349,12 +383,9 @@ def generate_additional_variables(data):
         for c in data.columns
         if c.startswith("hours") and not c.startswith("hours_cc")
     ]
-    for hr in hrs1:
-        data = get_baseline(data, hr + "_baseline", hr, baseline="2019-11-01")
-
     hrs2 = [c for c in data.columns if c.startswith("hours_cc")]
-    for hr in hrs2:
-        data = get_baseline(data, hr + "_baseline", hr)
+    data = get_baselines(data, hrs1, baseline="2019-11-01")
+    data = get_baselines(data, hrs2)
 
     # Change variables
     for hr in hrs1 + hrs2:
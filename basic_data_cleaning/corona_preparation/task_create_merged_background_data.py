@@ -1,4 +1,3 @@
-from functools import reduce
 from shutil import copyfile
 
 import pandas as pd
@@ -7,6 +6,7 @@ import yaml
 from config import CORONA_INSTALL
 from config import CORONA_PREP_LISS
 from config import IN_SPECS_CORONA
+from config import INTERCHANGE_FORMAT
 from config import OUT_DATA_CORONA_INSTALL
 from config import OUT_DATA_CORONA_PREP
 from config import OUT_DATA_LISS
@@ -15,6 +15,7 @@ from corona_preparation.task_load_data_sets import (
 )
 from corona_preparation.utils_corona_prep import create_new_background_variables
 from corona_preparation.utils_corona_prep import load_data_set
+from corona_preparation.utils_corona_prep import load_data_set_liss
 from corona_preparation.utils_corona_prep import save_and_check_data_set
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
@@ -25,41 +26,58 @@ def create_background_data_wide():
         IN_SPECS_CORONA / "background_data_variable_description.csv", sep=";"
     ).replace({"bool": "boolean"})
 
-    # Load in data sets
+    # Load only the variables used from each data set
     data_sets = {
-        ds_name: load_data_set(ds_name)
+        ds_name: _select_variables(
+            load_data_set(
+                ds_name,
+                columns=_unique(
+                    ["personal_id", *_variables_used(var_description, ds_name)]
+                ),
+                errors="ignore",
+            ),
+            ds_name,
+            var_description,
+        )
         for ds_name in var_description["liss-data-set"].value_counts().index
         if ds_name != "background_selected"
     }
     # Get Background Data
-    background_files = ["background_full_2020.pickle", "background_full_2019.pickle"]
+    background_columns = _variables_used(var_description, "background_selected")
     background_df = pd.concat(
-        [pd.read_pickle(OUT_DATA_LISS / file) for file in background_files]
+        [
+            load_data_set_liss(
+                f"background_full_{year}",
+                columns=_unique([*background_columns, "date_fieldwork"]),
+                errors="ignore",
+            )
+            for year in [2020, 2019]
+        ]
     )
     background_df = background_df.reset_index()
 
-    data_sets["background_selected"] = select_last_obs_from_last_two_pre_covid_waves(
-        background_df, tolerance=103
+    data_sets["background_selected"] = _select_variables(
+        select_last_obs_from_last_two_pre_covid_waves(background_df, tolerance=103),
+        "background_selected",
+        var_description,
     )
+    del background_df
 
-    # Select variables
-    for ds_name in data_sets:
-        variables_used = var_description.loc[
-            var_description["liss-data-set"] == ds_name, "import_name"
-        ].values
-        data_sets[ds_name] = data_sets[ds_name][
-            [x for x in variables_used if x in data_sets[ds_name].columns]
-        ]
-
-    # Merge all studies
-    data_merged = reduce(
-        lambda x, y: pd.merge(x, y, on="personal_id", how="outer"), data_sets.values()
-    )
+    # Merge all studies in one pass on their personal_id index
+    for ds_name, df in data_sets.items():
+        duplicated = df.index[df.index.duplicated()].unique().tolist()
+        assert not duplicated, f"personal_id is not unique in {ds_name}: {duplicated}"
+    data_merged = pd.concat(data_sets.values(), axis=1, join="outer", sort=True)
+    data_merged.index.name = "personal_id"
+    del data_sets
 
     # Replacing and renaming of some values and columns of the data frame.
     with open(IN_SPECS_CORONA / "background_data_merged_replacing.yaml") as file:
         replace_dict = yaml.safe_load(file)
-    data_merged = replace_values(data_merged, replace_dict, var_description)
+    # Missing values are unified when saving the data set
+    data_merged = replace_values(
+        data_merged, replace_dict, var_description, unify_missing=False
+    )
 
     # Set types
     data_merged = set_types_file(
@@ -88,19 +106,46 @@ def create_background_data_wide():
     save_and_check_data_set(data_merged, "background_data_merged")
 
 
+def _select_variables(df, ds_name, var_description):
+    """Select the variables of data set *ds_name* used in the background data.
+
+    The data set is indexed by personal_id.
+
+    """
+    variables_used = _variables_used(var_description, ds_name)
+    if "personal_id" in df.columns:
+        df = df.set_index("personal_id")
+    return df[[x for x in variables_used if x in df.columns]]
+
+
+def _variables_used(var_description, ds_name):
+    """Return the variables of data set *ds_name* used in the background data."""
+    return var_description.loc[
+        var_description["liss-data-set"] == ds_name, "import_name"
+    ].tolist()
+
+
+def _unique(columns):
+    """Remove duplicates from *columns* keeping the order."""
+    return list(dict.fromkeys(columns))
+
+
 def clean_and_save_monthly_background(months):
     for month in months:
         year = str(month)[:4]
-        path = OUT_DATA_LISS / f"background_full_{year}.pickle"
-        df = pd.read_pickle(path)
-        out = df.query(f"date_fieldwork=={int(month)}")
+        out = load_data_set_liss(
+            f"background_full_{year}", filters=[("date_fieldwork", "==", int(month))]
+        )
         out.to_pickle(OUT_DATA_CORONA_PREP / f"background_{month}")
 
 
 data_sets = yaml.safe_load(open(IN_SPECS_CORONA / "data_sets_corona_prep.yaml", "rb"))
 
 DEPENDS_ON = (
-    [OUT_DATA_CORONA_PREP / f"{ds_name}_selected.pickle" for ds_name in data_sets]
+    [
+        OUT_DATA_CORONA_PREP / f"{ds_name}_selected.{INTERCHANGE_FORMAT}"
+        for ds_name in data_sets
+    ]
     + [
         IN_SPECS_CORONA / "background_data_variable_description.csv",
         IN_SPECS_CORONA / "background_data_long_variable_description.csv",
@@ -116,7 +161,7 @@ PRODUCES = [
 ]
 for month in [202003, 202004]:
     year = str(month)[:4]
-    DEPENDS_ON.append(OUT_DATA_LISS / f"background_full_{year}.pickle")
+    DEPENDS_ON.append(OUT_DATA_LISS / f"background_full_{year}.{INTERCHANGE_FORMAT}")
     PRODUCES.append(OUT_DATA_CORONA_PREP / f"background_{month}")
 
 
@@ -8,6 +8,7 @@ import yaml
 from config import CORONA_INSTALL
 from config import CORONA_PREP_LISS
 from config import IN_SPECS_CORONA
+from config import INTERCHANGE_FORMAT
 from config import OUT_DATA_CORONA_INSTALL
 from config import OUT_DATA_CORONA_PREP
 from config import OUT_DATA_LISS
@@ -45,55 +46,29 @@ def _stretch_year(x):
 
 data_sets = yaml.safe_load(open(IN_SPECS_CORONA / "data_sets_corona_prep.yaml", "rb"))
 
-PRODUCES = (
-    [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_selected.pickle"
-        for ds_name in data_sets
-        if data_sets[ds_name]["selected"]
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_selected.csv"
-        for ds_name in data_sets
-        if data_sets[ds_name]["selected"]
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_selected.dta"
-        for ds_name in data_sets
-        if data_sets[ds_name]["stata"] and data_sets[ds_name]["selected"]
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}.pickle"
-        for ds_name in data_sets
-        if type(data_sets[ds_name]["subset"]) is list
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}.csv"
-        for ds_name in data_sets
-        if type(data_sets[ds_name]["subset"]) is list
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}.dta"
-        for ds_name in data_sets
-        if data_sets[ds_name]["stata"] and type(data_sets[ds_name]["subset"]) is list
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_full.pickle"
-        for ds_name in data_sets
-        if data_sets[ds_name]["subset"] == "full"
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_full.csv"
-        for ds_name in data_sets
-        if data_sets[ds_name]["subset"] == "full"
-    ]
-    + [
-        OUT_DATA_CORONA_PREP / f"{ds_name}_full.dta"
-        for ds_name in data_sets
-        if data_sets[ds_name]["subset"] == "full" and data_sets[ds_name]["stata"]
-    ]
-)
 
-DEPENDS_ON = [OUT_DATA_LISS / f"{ds_name}.pickle" for ds_name in data_sets] + [
+def _output_names(ds_name, specs):
+    """Return the names of the data sets saved for *ds_name*."""
+    names = []
+    if specs["selected"]:
+        names.append(f"{ds_name}_selected")
+    if type(specs["subset"]) is list:
+        names.append(ds_name)
+    if specs["subset"] == "full":
+        names.append(f"{ds_name}_full")
+    return names
+
+
+PRODUCES = [
+    OUT_DATA_CORONA_PREP / f"{name}.{file_format}"
+    for ds_name, specs in data_sets.items()
+    for name in _output_names(ds_name, specs)
+    for file_format in specs["formats"]
+]
+
+DEPENDS_ON = [
+    OUT_DATA_LISS / f"{ds_name}.{INTERCHANGE_FORMAT}" for ds_name in data_sets
+] + [
     "utils_corona_prep.py",
     IN_SPECS_CORONA / "data_sets_corona_prep.yaml",
 ]
@@ -125,7 +100,7 @@ def task_load_data_sets(depends_on, produces):
 
             # Save files
             save_and_check_data_set(
-                df_selected, f"{ds_name}_selected", stata=specs["stata"]
+                df_selected, f"{ds_name}_selected", formats=specs["formats"]
             )
 
         if type(specs["subset"]) is list:
@@ -133,7 +108,7 @@ def task_load_data_sets(depends_on, produces):
             temp = df_full.query(f"year in {years}")
             temp = temp.dropna(axis="columns", how="all")
 
-            save_and_check_data_set(temp, f"{ds_name}", stata=specs["stata"])
+            save_and_check_data_set(temp, f"{ds_name}", formats=specs["formats"])
 
         if specs["subset"] == "full":
             # manually drop columns that are all missing
@@ -141,7 +116,9 @@ def task_load_data_sets(depends_on, produces):
                 df_full = df_full.drop(
                     ["impact_college_sec_child4", "impact_college_sec_child5"], axis=1
                 )
-            save_and_check_data_set(df_full, f"{ds_name}_full", stata=specs["stata"])
+            save_and_check_data_set(
+                df_full, f"{ds_name}_full", formats=specs["formats"]
+            )
 
 
 PARAMETRIZATION = [
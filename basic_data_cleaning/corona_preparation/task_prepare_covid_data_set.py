@@ -17,6 +17,7 @@ from corona_preparation.utils_corona_prep import create_mhi5
 from corona_preparation.utils_corona_prep import create_weighting
 from corona_preparation.utils_corona_prep import load_data_set
 from corona_preparation.utils_corona_prep import save_and_check_data_set
+from corona_preparation.utils_corona_prep import save_data_set_by_month
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 
@@ -200,13 +201,9 @@ def task_prepare_covid_data_set(depends_on, produces):
         not corona.columns.isnull().any()
     ), f"There are NaN columns in the data set. {corona.columns[corona.columns.isnull()]}"
 
-    # Save data sets by month
-    for month in corona.index.unique(level="month"):
-        temp = corona.loc[pd.IndexSlice[:, month], :].copy()
-
-        # Drop variables that haven't been asked in this wave
-        temp = temp.dropna(axis="columns", how="all")
-        save_and_check_data_set(temp, "covid_data_" + str(month)[:7].replace("-", "_"))
+    # Save data sets by month without the variables that haven't been asked in
+    # the wave
+    save_data_set_by_month(corona, "covid_data_")
 
 
 def save_corona_bg_vars(corona):
@@ -220,8 +217,13 @@ def save_corona_bg_vars(corona):
     with open(IN_SPECS_CORONA / "background_data_merged_replacing.yaml") as file:
         replace_dict = yaml.safe_load(file)
 
+    # Missing values are unified when saving the data set
     out = replace_values(
-        out, replace_dict, var_description, raise_if_missing_vars=False
+        out,
+        replace_dict,
+        var_description,
+        raise_if_missing_vars=False,
+        unify_missing=False,
     )
 
     out = set_types_file(
@@ -1,34 +1,119 @@
 """
 This file contains some crucial utilities
 """
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from config import IN_SPECS_CORONA
+from config import INTERCHANGE_FORMAT
 from config import OUT_DATA_CORONA_PREP
 from config import OUT_DATA_LISS
+from liss_data.utils_liss_data import household_aggregates
+from liss_data.utils_liss_data import read_parquet
+from liss_data.utils_liss_data import unify_missing_values
 from liss_data.utils_liss_data import variable_cleaning_for_dta
+from liss_data.utils_liss_data import write_csv
+from liss_data.utils_liss_data import write_parquet
 from pandas.api.types import is_categorical
 
 
-def load_data_set_liss(data_set_name):
+def load_data_set_liss(data_set_name, columns=None, filters=None, errors="raise"):
     """
     Load the data set with name data_set_name.
+
+    Args:
+        data_set_name (string): name of the data set
+        columns (list): columns to be loaded, all if None
+        filters (list): row filters as tuples (column, operator, value), e.g.
+            [("year", ">=", 2018)]. Applied to columns and index levels.
+        errors (str): "raise" or "ignore" columns that are not in the data set
+
+    Returns:
+        DataFrame: loaded data set
     """
 
-    return pd.read_pickle(OUT_DATA_LISS / f"{data_set_name}.pickle")
+    return _load(OUT_DATA_LISS / data_set_name, columns, filters, errors)
 
 
-def load_data_set(data_set_name):
+def load_data_set(data_set_name, columns=None, filters=None, errors="raise"):
     """
     Load the data set with name data_set_name.
+
+    Args:
+        data_set_name (string): name of the data set
+        columns (list): columns to be loaded, all if None
+        filters (list): row filters as tuples (column, operator, value), e.g.
+            [("month", "in", months)]. Applied to columns and index levels.
+        errors (str): "raise" or "ignore" columns that are not in the data set
+
+    Returns:
+        DataFrame: loaded data set
     """
 
-    return pd.read_pickle(OUT_DATA_CORONA_PREP / f"{data_set_name}.pickle")
+    return _load(OUT_DATA_CORONA_PREP / data_set_name, columns, filters, errors)
+
+
+def _load(path_without_suffix, columns, filters, errors):
+    """Load a data set in the interchange format."""
+    if errors not in ["raise", "ignore"]:
+        raise ValueError('errors must be "raise" or "ignore".')
+
+    if INTERCHANGE_FORMAT == "parquet":
+        path = path_without_suffix.with_suffix(".parquet")
+        if columns is not None and errors == "ignore":
+            schema = pq.read_schema(path)
+            index_columns = (schema.pandas_metadata or {}).get("index_columns", [])
+            available = set(schema.names) - set(map(str, index_columns))
+            columns = [c for c in columns if c in available]
+        return read_parquet(path, columns, filters)
+
+    df = pd.read_pickle(path_without_suffix.with_suffix(".pickle"))
+    if columns is not None:
+        if errors == "ignore":
+            columns = [c for c in columns if c in df.columns]
+        df = df[columns]
+    if filters:
+        df = df[_filter_mask(df, filters)]
+    return df
 
 
-def save_and_check_data_set(data, data_set_name, stata=True):
+def _filter_mask(df, filters):
+    """Evaluate pyarrow style *filters* on *df* in memory."""
+    operators = {
+        "==": lambda x, v: x == v,
+        "=": lambda x, v: x == v,
+        "!=": lambda x, v: x != v,
+        "<": lambda x, v: x < v,
+        "<=": lambda x, v: x <= v,
+        ">": lambda x, v: x > v,
+        ">=": lambda x, v: x >= v,
+        "in": lambda x, v: x.isin(v),
+        "not in": lambda x, v: ~x.isin(v),
+    }
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        values = df[col] if col in df else df.index.get_level_values(col)
+        mask &= np.asarray(operators[op](values, value))
+    return mask
+
+
+def save_and_check_data_set(data, data_set_name, stata=True, formats=None):
     """
     Save the data set with name data_set_name.
+
+    The formats are written concurrently from the same data frame. The data set
+    is always saved in the format used to load it in later stages.
+
+    Args:
+        data (DataFrame): data set to be saved
+        data_set_name (string): name of the data set
+        stata (bool): save a Stata file, too. Only used if formats is None.
+        formats (list): file formats, any of "pickle", "csv", "dta" and
+            "parquet". Defaults to pickle and csv.
+
     """
 
     # Check for columns with all nan or nan columns
@@ -39,15 +124,83 @@ def save_and_check_data_set(data, data_set_name, stata=True):
     assert (
         not data.columns.isnull().any()
     ), f"There are NaN columns in the data set. {data.columns[data.columns.isnull()]}"
-    data = _check_for_two_types_of_missing(data)
+    data = unify_missing_values(data, report=True)
+
+    formats = _complete_formats(formats, stata)
 
     # Save data
-    data.to_pickle(OUT_DATA_CORONA_PREP / f"{data_set_name}.pickle")
-    data.to_csv(OUT_DATA_CORONA_PREP / f"{data_set_name}.csv", sep=";")
-    if stata:
-        data = variable_cleaning_for_dta(data.copy(deep=True))
-        data.to_stata(OUT_DATA_CORONA_PREP / f"{data_set_name}.dta")
-        # data.to_parquet(ppj("OUT_DATA_CORONA_PREP", f"{data_set_name}.parquet"))
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        futures = _submit_writers(executor, data, data_set_name, formats)
+        for future in futures:
+            future.result()
+
+
+def save_data_set_by_month(data, data_set_name, stata=True, formats=None):
+    """
+    Save one data set for each month of data.
+
+    The data set of a month is named data_set_name followed by the month as
+    YYYY_MM and contains only the columns that are not all missing in that
+    month. The non-missing columns of all months are determined at once. The
+    formats of a month are written concurrently while the next month is
+    prepared, such that at most two months are held in memory besides *data*.
+
+    Args:
+        data (DataFrame): data set with index level "month"
+        data_set_name (string): prefix of the names of the data sets
+        stata (bool): save Stata files, too. Only used if formats is None.
+        formats (list): file formats, see save_and_check_data_set.
+
+    """
+    assert (
+        not data.columns.isnull().any()
+    ), f"There are NaN columns in the data set. {data.columns[data.columns.isnull()]}"
+
+    formats = _complete_formats(formats, stata)
+    grouped = data.notna().groupby(level="month", sort=True)
+    not_all_missing = grouped.any()
+    positions = grouped.indices
+
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        futures = []
+        for month, columns in not_all_missing.iterrows():
+            temp = data.iloc[positions[month], columns.to_numpy()]
+            temp = unify_missing_values(temp, report=True)
+            name = data_set_name + str(month)[:7].replace("-", "_")
+            # Wait for the previous month before writing this one
+            for future in futures:
+                future.result()
+            futures = _submit_writers(executor, temp, name, formats)
+            del temp
+        for future in futures:
+            future.result()
+
+
+def _complete_formats(formats, stata):
+    """Return the file formats to save a data set in."""
+    if formats is None:
+        formats = ["pickle", "csv"] + (["dta"] if stata else [])
+    return list(dict.fromkeys([INTERCHANGE_FORMAT] + list(formats)))
+
+
+def _submit_writers(executor, data, data_set_name, formats):
+    """Submit writing *data* in each of *formats* to *executor*."""
+    return [
+        executor.submit(
+            _WRITERS[file_format],
+            data,
+            OUT_DATA_CORONA_PREP / f"{data_set_name}.{file_format}",
+        )
+        for file_format in formats
+    ]
+
+
+_WRITERS = {
+    "pickle": lambda data, path: data.to_pickle(path),
+    "csv": lambda data, path: write_csv(data, path, clean_strings=False),
+    "dta": lambda data, path: variable_cleaning_for_dta(data).to_stata(path),
+    "parquet": write_parquet,
+}
 
 
 def create_mhi5(data, suffix):
@@ -113,17 +266,7 @@ def create_new_background_variables(df):
     ] = np.nan
     df.loc[df["mortgage"] > df["real_estate"] * 2, ["wealth", "mortgage"]] = np.nan
 
-    # Find out age of youngest child
-    temp = (
-        df.query("(hh_position == 'Child living at home')")
-        .copy()[["age", "hh_id"]]
-        .groupby("hh_id")
-        .min()
-    )
-    temp = temp.rename(columns={"age": "age_youngest_child"})
-    df = pd.merge(df, temp, left_on="hh_id", right_index=True, how="left")
-
-    # Generate hh_wide variables
+    # Household aggregates: age of youngest child and hh_wide variables
     hh_wide_vars = [
         "wealth",
         "total_financial_assets",
@@ -131,15 +274,16 @@ def create_new_background_variables(df):
         "home_price",
         "home_remaining_mortgage",
     ]
-    for var in hh_wide_vars:
-        df = (
-            df.reset_index()
-            .set_index("hh_id")
-            .join(df.groupby("hh_id")[var].sum(min_count=1), rsuffix="_hh")
-            .reset_index()
-            .set_index("personal_id")
-        )
-        df = df.drop([var], axis=1)
+    aggregations = {"age_youngest_child": ("age_child", "min")}
+    aggregations.update({var + "_hh": (var, "sum") for var in hh_wide_vars})
+    is_child = df["hh_position"] == "Child living at home"
+    hh_aggregates = household_aggregates(
+        df.assign(age_child=df["age"].where(is_child)),
+        aggregations,
+        min_count=1,
+        broadcast=True,
+    )
+    df = pd.concat([df.drop(hh_wide_vars, axis=1), hh_aggregates], axis=1)
 
     # Equivalise some vars
     for var in hh_wide_vars + ["net_income"]:
@@ -178,11 +322,19 @@ def create_new_background_variables(df):
     return df
 
 
-def create_weighting(raw_df):
+def create_weighting(raw_df, method="cells", **raking_options):
     """Create weights based on demographics (age, gender, civil_status)
 
+    The weights of all periods are computed at once. With method "cells", the
+    weights are the ratio of the population share and the sample share of the
+    age x gender x civil_status cell of an observation in its period. With
+    method "raking", the weights match the population distribution of each
+    variable separately (see rake_weights).
+
     Args:
         raw_df (DataFrame): Original data
+        method (str): "cells" or "raking"
+        raking_options: keyword arguments passed to rake_weights
 
     Returns:
         DataFrame: Original data including the new weights
@@ -204,27 +356,177 @@ def create_weighting(raw_df):
     df["age"] = pd.cut(df["age"], age_bins)
     df["civil_status"] = df["civil_status"].replace({"Separated": "Married"})
 
-    # Calculate distribution in sample and weights for each period
-    weights_by_period = {}
-    for period in df.index.unique("period"):
-        sample = df.xs(period, level="period")
-        sample_dist = sample.groupby(weighting_vars).size() / len(sample)
+    # Check that all observed demographics are in the population data set
+    for var in weighting_vars:
+        unknown = ~df[var].isin(population_dist.index.unique(level=var))
+        assert not unknown.any(), f"{df.loc[unknown, var].iloc[0]}"
 
-        # Check that all observed combinations of demographics are
-        # in the population data set
-        for i in range(len(sample_dist.index.names)):
-            for value in sample_dist.index.unique(level=i):
-                assert value in population_dist.index.unique(level=i), f"{value}"
-        weights = (population_dist / sample_dist.loc[sample_dist != 0]).dropna()
-        weights.name = "age_sex_marital_weighting"
-        weights_by_period[period] = weights
+    if method == "cells":
+        weights = post_stratification_weights(df, population_dist, by="period")
+    elif method == "raking":
+        margins = {
+            var: population_dist.groupby(level=var).sum() for var in weighting_vars
+        }
+        weights, _ = rake_weights(df, margins, by="period", **raking_options)
+    else:
+        raise ValueError(f"Unknown weighting method {method}.")
+
+    weights.name = "age_sex_marital_weighting"
+    return raw_df.join(weights)
+
+
+def post_stratification_weights(df, population_dist, by):
+    """Compute post-stratification weights for all groups *by* at once.
+
+    The weight of an observation is the population share of its cell divided by
+    the share of the cell among the observations of its group.
+
+    Args:
+        df (DataFrame): sample with one column for each index level of
+            population_dist
+        population_dist (Series): population shares of the cells
+        by (str or list): columns or index levels defining the groups, e.g.
+            the period
+
+    Returns:
+        Series: weights with the index of df, missing for cells that are not
+            in population_dist
+    """
+    cell_vars = list(population_dist.index.names)
+    by = [by] if isinstance(by, str) else list(by)
+
+    cell_size = df.groupby(by + cell_vars, observed=True)[cell_vars[0]].transform(
+        "size"
+    )
+    group_size = df.groupby(by)[cell_vars[0]].transform("size")
+
+    if len(cell_vars) > 1:
+        cells = pd.MultiIndex.from_frame(df[cell_vars])
+    else:
+        cells = pd.Index(df[cell_vars[0]])
+    population_share = population_dist.reindex(cells).to_numpy()
+
+    return pd.Series(
+        population_share / (cell_size / group_size).to_numpy(), index=df.index
+    )
+
+
+def rake_weights(df, margins, by=None, max_iter=100, tol=1e-10):
+    """Compute weights by raking (iterative proportional fitting) on marginals.
 
-    # Aggregate weights and merge to LISS data
-    weights = pd.concat(weights_by_period)
-    out = df.join(weights, on=["period"] + weighting_vars)
-    out = out["age_sex_marital_weighting"]
+    The weights are adjusted variable by variable until the weighted
+    distribution of each variable matches its population margin within each
+    group *by*. The targets of the observations are looked up once and reused
+    in each iteration and for all groups.
 
-    return raw_df.join(out)
+    If a category of a variable is not observed in a group, its population
+    share cannot be matched. The margin is then restricted to the categories
+    observed in the group and rescaled to sum up to one.
+
+    Args:
+        df (DataFrame): sample with a column for each variable in margins
+        margins (dict): keys are variables, values are Series with the
+            population shares of the categories of the variable
+        by (str or list): columns or index levels defining the groups that are
+            weighted separately, e.g. the period. All observations form one
+            group if None.
+        max_iter (int): maximum number of iterations
+        tol (float): stop if the largest absolute difference between a
+            weighted sample share and its target is below tol
+
+    Returns:
+        Series: weights with the index of df, summing up to the number of
+            observations in each group
+        dict: convergence diagnostics with keys "converged", "n_iter",
+            "max_deviation" and "deviation_by_group", a Series with the largest
+            deviation from the margins in each group
+    """
+    n_obs = len(df)
+    if by is None:
+        group = np.zeros(n_obs, dtype=int)
+        group_keys = pd.Index([None])
+    else:
+        by = [by] if isinstance(by, str) else list(by)
+        grouped = df.groupby(by, sort=False)
+        group = grouped.ngroup().to_numpy()
+        group_keys = grouped.size().index
+
+    # Cells of each variable within groups and their targets
+    cells = {}
+    targets = {}
+    for var, margin in margins.items():
+        margin = margin / margin.sum()
+        target = margin.reindex(df[var]).to_numpy()
+        assert not np.isnan(target).any(), f"Values of {var} without margin."
+        cells[var] = (
+            pd.DataFrame({"group": group, var: df[var].to_numpy()})
+            .groupby(["group", var], sort=False, observed=True)
+            .ngroup()
+            .to_numpy()
+        )
+        cell_target = np.bincount(cells[var], weights=target) / np.bincount(cells[var])
+        # Rescale the targets of the categories observed in each group to one
+        cell_group = np.zeros(len(cell_target), dtype=int)
+        cell_group[cells[var]] = group
+        targets[var] = (
+            cell_target / np.bincount(cell_group, weights=cell_target)[cell_group]
+        )
+
+    weights = np.ones(n_obs)
+    group_size = np.bincount(group)
+    converged = False
+    for n_iter in range(1, max_iter + 1):
+        for var in margins:
+            share = _weighted_cell_shares(weights, cells[var], group)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                factor = np.where(share > 0, targets[var] / share, 0)
+            weights *= factor[cells[var]]
+
+        deviation = _max_deviation_by_group(weights, cells, targets, group)
+        max_deviation = deviation.max()
+        if max_deviation < tol:
+            converged = True
+            break
+
+    deviation_by_group = pd.Series(deviation, index=group_keys)
+    if not converged:
+        not_converged = deviation_by_group.index[deviation_by_group >= tol]
+        warnings.warn(
+            f"Raking did not converge after {max_iter} iterations in groups"
+            f" {not_converged.tolist()}. The largest deviation from the margins is"
+            f" {max_deviation}."
+        )
+
+    weights *= (group_size / np.bincount(group, weights=weights))[group]
+    diagnostics = {
+        "converged": converged,
+        "n_iter": n_iter,
+        "max_deviation": max_deviation,
+        "deviation_by_group": deviation_by_group,
+    }
+    return pd.Series(weights, index=df.index), diagnostics
+
+
+def _max_deviation_by_group(weights, cells, targets, group):
+    """Return the largest deviation of a weighted share from its target by group."""
+    deviation = np.zeros(group.max() + 1 if len(group) else 0)
+    for var, cell in cells.items():
+        cell_deviation = np.abs(
+            _weighted_cell_shares(weights, cell, group) - targets[var]
+        )
+        cell_group = np.zeros(len(cell_deviation), dtype=int)
+        cell_group[cell] = group
+        np.maximum.at(deviation, cell_group, cell_deviation)
+    return deviation
+
+
+def _weighted_cell_shares(weights, cell, group):
+    """Return the weighted share of each cell in its group."""
+    cell_total = np.bincount(cell, weights=weights)
+    group_total = np.bincount(group, weights=weights)
+    cell_group = np.zeros(len(cell_total), dtype=int)
+    cell_group[cell] = group
+    return cell_total / group_total[cell_group]
 
 
 def load_population_dist(weighting_vars):
@@ -266,26 +568,6 @@ def load_population_dist(weighting_vars):
     return age_bins, population_dist
 
 
-def _fix_nans(x):
-    if pd.isna(x):
-        return np.nan
-    else:
-        return x
-
-
-def _check_for_two_types_of_missing(df):
-    # Make sure columns contain only one type of missing
-    for col in df.columns:
-        pd_na = any(x is pd.NA for x in list(df[col].unique()))
-        np_na = any(x is pd.NA for x in list(df[col].unique()))
-        if pd_na & np_na:
-            print(
-                f"{col} contains two types of nans. Will be fixed. Should be checked!"
-            )
-            df[col] = df[col].map(lambda x: _fix_nans(x))
-    return df
-
-
 def cat_to_float(sr):
     if is_categorical(sr):
         res = sr.cat.codes.replace({-1: np.nan}).astype(float)
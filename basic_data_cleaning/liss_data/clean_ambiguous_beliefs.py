@@ -1,5 +1,4 @@
 import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.clean_pref_numeracy import get_ce
 from liss_data.clean_pref_numeracy import get_map_to_risk_av_scores
@@ -9,6 +8,8 @@ from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
 from liss_data.data_management_ambig_beliefs import create_ambig_beliefs_basic_files
 from liss_data.utils_liss_data import clean_background_vars
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_ambiguous_beliefs(data, file_format):
@@ -20,14 +21,12 @@ def clean_ambiguous_beliefs(data, file_format):
     create_ambig_beliefs_basic_files(data, file_format)
 
     # replace portfolio names and convert values to numerics
-    with open(IN_SPECS_LISS / "xxx-ambiguous-beliefs_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
-
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "xxx-ambiguous-beliefs_renaming.csv",
-        sep=";",
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "xxx-ambiguous-beliefs_replacing.yaml"
     )
 
+    rename_df = load_spec_csv(IN_SPECS_LISS / "xxx-ambiguous-beliefs_renaming.csv")
+
     data = replace_values(data, replace_dict, rename_df)
     fin_num_to_sol = {
         "fin_num_interest_basic": "meer dan 1010 euro",
@@ -1,10 +1,11 @@
 import numpy as np
 import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_assets(panel):
@@ -18,12 +19,12 @@ def clean_assets(panel):
 
     """
     # Replace and rename some values and columns of the data frame.
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "009-economic-situation-assets_renaming.csv",
-        sep=";",
+    rename_df = load_spec_csv(
+        IN_SPECS_LISS / "009-economic-situation-assets_renaming.csv"
+    )
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "009-economic-situation-assets_replacing.yaml"
     )
-    with open(IN_SPECS_LISS / "009-economic-situation-assets_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
 
     panel = replace_values(panel, replace_dict, rename_df)
 
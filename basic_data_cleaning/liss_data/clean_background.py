@@ -1,11 +1,13 @@
 import numpy as np
 import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from config import OUT_DATA_LISS
-from liss_data.cleaning_helpers import replace_values
+from liss_data.cleaning_helpers import apply_replace_plan
+from liss_data.cleaning_helpers import compile_replace_plan
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_background(data_set_list, file_format):
@@ -13,14 +15,13 @@ def clean_background(data_set_list, file_format):
     Data cleaning for background questionnaire.
     Takes the within person-year mode of the background variables.
     """
-    with open(IN_SPECS_LISS / "001-background-variables_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
-
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "001-background-variables_renaming.csv",
-        sep=";",
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "001-background-variables_replacing.yaml"
     )
 
+    rename_df = load_spec_csv(IN_SPECS_LISS / "001-background-variables_renaming.csv")
+    replace_plan = compile_replace_plan(replace_dict, rename_df)
+
     # Apply groupby separated for each year to use less memory
     years_in_data = sorted({d["year"].iloc[0] for d in data_set_list})
     results_by_year = []
@@ -29,7 +30,7 @@ def clean_background(data_set_list, file_format):
         data = pd.concat(sel_data_sets, ignore_index=True, sort=True)
 
         # Replace and rename some values and columns of the data frame.
-        data = replace_values_background(data, replace_dict, rename_df)
+        data = replace_values_background(data, replace_plan)
 
         # Clean logically net_income and gross_income in background dataset.
         data = clean_logically_background(data)
@@ -101,28 +102,26 @@ def _create_additional_cols(data):
     return out
 
 
-def replace_values_background(data, replace_dict, rename_df):
+def replace_values_background(data, replace_plan):
     """Do some cleaning of the database by replacing and renaming some
     observations in the corona database, and adding certain columns where
     needed.
 
     Args:
         data(pandas.DataFrame): The data frame to be converted.
-        rename_dict(dict): Dictionary containing the information to replace the
-            values in the database.
-        rename_df(pandas.DataFrame): The renaming dataframe taken from the
-            renaming file.
+        replace_plan(dict): Replacing dictionary compiled with
+            compile_replace_plan.
 
     Returns:
         pandas.DataFrame: the data frame with the changes inplace.
     """
-    out = data.copy()
+    out = data.copy(deep=False)
 
     out["edu_4"] = out["education_cbs"]
     out["edu"] = out["education_cbs"]
     out["female"] = out["gender"].map({"Female": True, "Male": False})
     # Replace some variables:
-    out = replace_values(out, replace_dict, rename_df)
+    out = apply_replace_plan(out, replace_plan)
 
     return out
 
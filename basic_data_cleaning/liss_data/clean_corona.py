@@ -1,30 +1,28 @@
 """Clean the first questionnaire on the covid-19 epidemic in 2020."""
 import numpy as np
-import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import convert_time_cols
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
 from liss_data.utils_liss_data import clean_background_vars
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 from liss_data.utils_liss_data import merge_double_columns
 
 # from project_specific_analyses.data_management.utils import check_columns_only_nan
 
 
 def clean_corona(panel):
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "xyx-corona-questionnaire_renaming.csv",
-        sep=";",
-    )
+    rename_df = load_spec_csv(IN_SPECS_LISS / "xyx-corona-questionnaire_renaming.csv")
 
     # Update and merge columns.
     panel = _update_and_merge_columns(panel)
 
     # Replacing and renaming of some values and columns of the data frame.
-    with open(IN_SPECS_LISS / "xyx-corona-questionnaire_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "xyx-corona-questionnaire_replacing.yaml"
+    )
 
     panel = _replace_values_corona(panel, replace_dict, rename_df)
 
@@ -1,7 +1,7 @@
 import numpy as np
-import pandas as pd
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import set_types_file
+from liss_data.utils_liss_data import load_spec_csv
 
 
 def clean_housing(panel):
@@ -11,9 +11,8 @@ def clean_housing(panel):
     """
 
     # Replace and rename some values and columns of the data frame.
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "011-economic-situation-housing_renaming.csv",
-        sep=";",
+    rename_df = load_spec_csv(
+        IN_SPECS_LISS / "011-economic-situation-housing_renaming.csv"
     )
 
     # Some general renaming
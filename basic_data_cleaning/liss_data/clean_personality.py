@@ -1,9 +1,9 @@
-import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_personality(data):
@@ -12,12 +12,8 @@ def clean_personality(data):
     """
 
     # Replace and rename some values and columns of the data frame.
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "007-personality_renaming.csv",
-        sep=";",
-    )
-    with open(IN_SPECS_LISS / "007-personality_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
+    rename_df = load_spec_csv(IN_SPECS_LISS / "007-personality_renaming.csv")
+    replace_dict = load_spec_yaml(IN_SPECS_LISS / "007-personality_replacing.yaml")
 
     data = replace_values(panel=data, replace_dict=replace_dict, rename_df=rename_df)
 
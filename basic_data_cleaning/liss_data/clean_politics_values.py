@@ -1,21 +1,19 @@
-import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import convert_time_cols
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_politics_values(panel):
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "008-politics-and-values_renaming.csv",
-        sep=";",
-    )
+    rename_df = load_spec_csv(IN_SPECS_LISS / "008-politics-and-values_renaming.csv")
 
     # Replacing and renaming of some values and columns of the data frame.
-    with open(IN_SPECS_LISS / "008-politics-and-values_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "008-politics-and-values_replacing.yaml"
+    )
 
     panel = _replace_values_political_values(panel, replace_dict, rename_df)
 
@@ -1,7 +1,7 @@
 import numpy as np
-import pandas as pd
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import set_types_file
+from liss_data.utils_liss_data import load_spec_csv
 from pandas.api.types import CategoricalDtype
 
 
@@ -10,9 +10,7 @@ def clean_religion_ethnicity(panel):
     Data cleaning for religion questionnaire.
 
     """
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "003-religion-and-ethnicity_renaming.csv", sep=";"
-    )
+    rename_df = load_spec_csv(IN_SPECS_LISS / "003-religion-and-ethnicity_renaming.csv")
     panel = _general_replacements(panel)
     panel = _yes_no_maybe(panel)
     panel = _clean_categoricals(panel)
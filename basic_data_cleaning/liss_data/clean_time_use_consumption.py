@@ -3,13 +3,13 @@
 import math
 
 import numpy as np
-import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import convert_time_cols
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 from liss_data.utils_liss_data import merge_double_columns
 from liss_data.utils_liss_data import update_double_columns
 
@@ -19,12 +19,12 @@ def clean_time_use_consumption(panel):
     panel = _update_and_merge_columns(panel)
 
     # Replacing and renaming of some values and columns of the data frame.
-    with open(IN_SPECS_LISS / "034-time-use-and-consumption_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "034-time-use-and-consumption_replacing.yaml"
+    )
 
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "034-time-use-and-consumption_renaming.csv",
-        sep=";",
+    rename_df = load_spec_csv(
+        IN_SPECS_LISS / "034-time-use-and-consumption_renaming.csv"
     )
     panel = _replace_values_time_use(panel, replace_dict, rename_df)
 
@@ -3,25 +3,23 @@ This file contains all cleaning tools for the
 work and schooling dataset
 """
 import numpy as np
-import pandas as pd
-import yaml
 from config import IN_SPECS_LISS
 from liss_data.cleaning_helpers import convert_time_cols
 from liss_data.cleaning_helpers import replace_values
 from liss_data.cleaning_helpers import set_types_file
 from liss_data.data_checks import general_data_checks
+from liss_data.utils_liss_data import load_spec_csv
+from liss_data.utils_liss_data import load_spec_yaml
 
 
 def clean_work_schooling(panel):
 
-    rename_df = pd.read_csv(
-        IN_SPECS_LISS / "006-work-and-schooling_renaming.csv",
-        sep=";",
-    )
+    rename_df = load_spec_csv(IN_SPECS_LISS / "006-work-and-schooling_renaming.csv")
 
     # Replacing and renaming of some values and columns of the data frame.
-    with open(IN_SPECS_LISS / "006-work-and-schooling_replacing.yaml") as file:
-        replace_dict = yaml.safe_load(file)
+    replace_dict = load_spec_yaml(
+        IN_SPECS_LISS / "006-work-and-schooling_replacing.yaml"
+    )
     panel = _replace_values_work_schooling(panel, replace_dict, rename_df)
 
     # Set types of variables using renaming file.
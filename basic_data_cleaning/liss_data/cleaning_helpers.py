@@ -11,10 +11,22 @@ from inspect import getframeinfo
 import numpy as np
 import pandas as pd
 from liss_data.utils_liss_data import send_warnings_to_log as swtl
+from liss_data.utils_liss_data import unify_missing_values
 from pandas.api.types import infer_dtype
 
 
-def replace_values(panel, replace_dict, rename_df, raise_if_missing_vars=True):
+_TYPE_ALIASES = {
+    "int": "Int64",
+    "float": "float64",
+    "bool": "boolean",
+    "Categorical": "category",
+    "Int": "Int64",
+}
+
+
+def replace_values(
+    panel, replace_dict, rename_df, raise_if_missing_vars=True, unify_missing=True
+):
     """Replace and rename values using the replace dictionary.
 
     Args:
@@ -24,126 +36,254 @@ def replace_values(panel, replace_dict, rename_df, raise_if_missing_vars=True):
         rename_df (pandas.DataFrame): The renaming dataframe taken from the
             renaming file.
         raise_if_missing_vars (bool): Raise error if specified variables are missing
+        unify_missing (bool): Unify the missing values afterwards. Can be
+            skipped if this is done later in the same stage.
 
     Returns:
         pandas.DataFrame: The dataframe with the replaced or renamed values.
 
     """
+    replace_plan = compile_replace_plan(replace_dict, rename_df)
+    return apply_replace_plan(
+        panel, replace_plan, raise_if_missing_vars, unify_missing=unify_missing
+    )
 
-    out = panel.copy()
-    # Convert some columns to lower case
-    if "mixed_case" in replace_dict and replace_dict["mixed_case"]:
 
-        # Raise error if not all specified variables are in the DataFrame
-        mixed_case = [c for c in replace_dict["mixed_case"] if c in out]
-        mixed_case_mi = [c for c in replace_dict["mixed_case"] if c not in out]
-        if raise_if_missing_vars and len(mixed_case_mi) > 0:
-            raise ValueError(f"{mixed_case_mi} are missing in the DataFrame")
+def compile_replace_plan(replace_dict, rename_df):
+    """Compile the replacing dictionary into a plan that can be applied repeatedly.
 
-        out[mixed_case] = out[mixed_case].apply(lambda x: x.str.lower())
+    Args:
+        replace_dict (dictionary): The replacing dictionary.
+        rename_df (pandas.DataFrame): The renaming dataframe taken from the
+            renaming file.
 
-    # Convert numeric columns
-    if "numeric" in replace_dict and replace_dict["numeric"]:
+    Returns:
+        dict: The replacement plan with the entries
+            - "mixed_case" (list): columns converted to lower case.
+            - "numeric" (list): columns converted to numeric.
+            - "required" (list): columns (lists) or single variables (strings)
+              that have to be in the DataFrame.
+            - "steps" (list): replacement steps in the order they are applied.
+              Each step is a dictionary with the replacing "mapping", the
+              "columns" it applies to (None for all columns), the "error"
+              that is turned into a warning and the warning "message".
 
-        # Raise error if not all specified variables are in the DataFrame
-        numeric = [c for c in replace_dict["numeric"] if c in out]
-        numeric_mi = [c for c in replace_dict["numeric"] if c not in out]
-        if raise_if_missing_vars and len(numeric_mi) > 0:
-            raise ValueError(f"{numeric_mi} are missing in the DataFrame")
+    """
+    plan = {"mixed_case": [], "numeric": [], "required": [], "steps": []}
 
-        out[numeric] = out[numeric].apply(lambda x: pd.to_numeric(x, errors="coerce"))
+    for transformation in ["mixed_case", "numeric"]:
+        if transformation in replace_dict and replace_dict[transformation]:
+            plan[transformation] = list(replace_dict[transformation])
+            plan["required"].append(plan[transformation])
 
     # Rename variables according to their types.
-    if "type renaming" in replace_dict:
-
-        rename_df["type"] = rename_df["type"].replace(
-            {
-                "int": "Int64",
-                "float": "float64",
-                "bool": "boolean",
-                "Categorical": "category",
-                "Int": "Int64",
-            }
-        )
-
-        for group in replace_dict["type renaming"] and replace_dict["type renaming"]:
-            filter = rename_df["type"] == group
-            cols = rename_df.copy()[filter]["new_name"].values
-
-            # Raise error if not all specified variables are in the DataFrame
-            cols_restr = [c for c in cols if c in out]
-            cols_mi = [c for c in cols if c not in out]
-            if raise_if_missing_vars and len(cols_mi) > 0:
-                raise ValueError(f"{cols_mi} are missing in the DataFrame")
-
-            for col in cols_restr:
-                try:
-                    out[col] = out[col].replace(replace_dict["type renaming"][group])
-                except Exception:
-                    frameinfo = getframeinfo(currentframe())
-                    module_name = frameinfo.filename
-                    lineno = frameinfo.lineno - 1
-                    message = f"issue with {col}"
-                    warnings.warn(message)
-                    swtl(message=message, module_name=module_name, lineno=lineno)
-                    continue
+    if "type renaming" in replace_dict and replace_dict["type renaming"]:
+        types = rename_df["type"].replace(_TYPE_ALIASES)
+        for group, mapping in replace_dict["type renaming"].items():
+            cols = list(rename_df.loc[types == group, "new_name"].values)
+            plan["required"].append(cols)
+            for col in cols:
+                plan["steps"].append(
+                    {
+                        "columns": {col},
+                        "mapping": mapping,
+                        "error": Exception,
+                        "message": f"issue with {col}",
+                    }
+                )
 
     # Rename variables according to the renaming dictionary
     if "replacing" in replace_dict and replace_dict["replacing"]:
-        for _i in replace_dict["replacing"]:
-            if _i != "full_df":
-                if _i in out:
-                    try:
-                        out[_i].replace(replace_dict["replacing"][_i], inplace=True)
-                    except TypeError:
-                        frameinfo = getframeinfo(currentframe())
-                        module_name = frameinfo.filename
-                        lineno = frameinfo.lineno - 1
-                        message = f"type issue with {_i}"
-                        warnings.warn(message)
-                        swtl(message=message, module_name=module_name, lineno=lineno)
-                else:
-                    if raise_if_missing_vars:
-                        raise ValueError(f"{_i} is missing in the DataFrame")
-
-            else:
-                try:
-                    out.replace(replace_dict["replacing"][_i], inplace=True)
-                except TypeError:
-                    frameinfo = getframeinfo(currentframe())
-                    module_name = frameinfo.filename
-                    lineno = frameinfo.lineno - 1
-                    message = f"type issue with {_i}"
-                    warnings.warn(message)
-                    swtl(message=message, module_name=module_name, lineno=lineno)
+        for var, mapping in replace_dict["replacing"].items():
+            if var != "full_df":
+                plan["required"].append(var)
+            plan["steps"].append(
+                {
+                    "columns": None if var == "full_df" else {var},
+                    "mapping": mapping,
+                    "error": TypeError,
+                    "message": f"type issue with {var}",
+                }
+            )
 
     # Rename variables in multiple columns.
     if "multicolumn" in replace_dict and replace_dict["multicolumn"]:
-        for _j in replace_dict["multicolumn"]:
+        for group in replace_dict["multicolumn"].values():
+            plan["required"].append(group["columns"])
+            plan["steps"].append(
+                {
+                    "columns": set(group["columns"]),
+                    "mapping": group["dictionary"],
+                    "error": Exception,
+                    "message": f"error in {group}",
+                }
+            )
 
-            # Raise error if not all specified variables are in the DataFrame
-            cols = replace_dict["multicolumn"][_j]["columns"]
-            cols_restr = [c for c in cols if c in out]
-            cols_mi = [c for c in cols if c not in out]
-            if raise_if_missing_vars and len(cols_mi) > 0:
-                raise ValueError(f"{cols_mi} are missing in the DataFrame")
+    return plan
 
-            try:
-                out.loc[:, cols_restr] = out.loc[:, cols_restr].replace(
-                    replace_dict["multicolumn"][_j]["dictionary"]
-                )
-            except Exception:
-                frameinfo = getframeinfo(currentframe())
-                module_name = frameinfo.filename
-                lineno = frameinfo.lineno - 1
-                message = f"error in {replace_dict['multicolumn'][_j]}"
-                warnings.warn(message)
-                swtl(message=message, module_name=module_name, lineno=lineno)
-    out = _fix_nas(out)
+
+def apply_replace_plan(
+    panel, replace_plan, raise_if_missing_vars=True, unify_missing=True
+):
+    """Apply a plan created by :func:`compile_replace_plan` to *panel*.
+
+    All replacement steps of a column are combined into a single mapping which
+    is applied once. For categorical columns only the categories are replaced.
+    *panel* itself is not modified.
+
+    Args:
+        panel (pandas.DataFrame): The dataframe which values need to be
+            replaced or renamed.
+        replace_plan (dict): The compiled replacing dictionary.
+        raise_if_missing_vars (bool): Raise error if specified variables are missing
+        unify_missing (bool): Unify the missing values afterwards. Can be
+            skipped if this is done later in the same stage.
+
+    Returns:
+        pandas.DataFrame: The dataframe with the replaced or renamed values.
+
+    """
+    # Raise error if not all specified variables are in the DataFrame
+    if raise_if_missing_vars:
+        for required in replace_plan["required"]:
+            if isinstance(required, str):
+                if required not in panel:
+                    raise ValueError(f"{required} is missing in the DataFrame")
+            else:
+                missing = [c for c in required if c not in panel]
+                if len(missing) > 0:
+                    raise ValueError(f"{missing} are missing in the DataFrame")
+
+    out = panel.copy(deep=False)
+
+    # Convert some columns to lower case
+    for col in replace_plan["mixed_case"]:
+        if col in out:
+            out[col] = out[col].str.lower()
+
+    # Convert numeric columns
+    for col in replace_plan["numeric"]:
+        if col in out:
+            out[col] = pd.to_numeric(out[col], errors="coerce")
+
+    # Collect the replacement steps of each column
+    steps_by_col = {}
+    for step in replace_plan["steps"]:
+        cols = out.columns if step["columns"] is None else step["columns"]
+        for col in cols:
+            if col in out:
+                steps_by_col.setdefault(col, []).append(step)
+
+    for col, steps in steps_by_col.items():
+        out[col] = _replace_column(out[col], steps)
+
+    if unify_missing:
+        out = unify_missing_values(out)
 
     return out
 
 
+def _replace_column(col, steps):
+    """Apply all replacement *steps* to *col* in one go.
+
+    If that fails, the steps are applied one by one such that the failing
+    steps are skipped with the same warning as before.
+
+    """
+    mappings = [step["mapping"] for step in steps]
+    try:
+        if col.dtype.name == "category":
+            return _replace_categories(col, mappings)
+        else:
+            return _replace_with_mapping(col, _compose_mappings(mappings))
+    except Exception:
+        pass
+
+    for step in steps:
+        try:
+            col = _replace_with_mapping(col, step["mapping"])
+        except step["error"]:
+            frameinfo = getframeinfo(currentframe())
+            module_name = frameinfo.filename
+            lineno = frameinfo.lineno - 1
+            message = step["message"]
+            warnings.warn(message)
+            swtl(message=message, module_name=module_name, lineno=lineno)
+    return col
+
+
+def _compose_mappings(mappings):
+    """Combine consecutive *mappings* into a single mapping.
+
+    Each mapping replaces the values as they are after the previous ones, the
+    entries of one mapping are applied simultaneously as by Series.replace.
+
+    """
+    composed = {}
+    for mapping in mappings:
+        composed = {
+            old: mapping.get(new, new) if _is_hashable(new) else new
+            for old, new in composed.items()
+        }
+        for old, new in mapping.items():
+            if old not in composed:
+                composed[old] = new
+    return composed
+
+
+def _is_hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _replace_with_mapping(col, mapping):
+    if not mapping:
+        return col
+    elif col.dtype.name == "category":
+        return _replace_categories(col, [mapping])
+    else:
+        return col.replace(mapping)
+
+
+def _replace_categories(col, mappings):
+    """Replace the categories of *col* instead of its values.
+
+    Series.replace replaces the categories of a categorical one entry of a
+    mapping after the other, so entries can be chained. To get exactly the
+    same categories, the *mappings* are applied in order to a categorical that
+    contains each category once. The codes of *col* are then translated to the
+    new categories.
+
+    """
+    n_categories = len(col.cat.categories)
+    replaced = pd.Series(
+        pd.Categorical.from_codes(range(n_categories), dtype=col.dtype)
+    )
+    for mapping in mappings:
+        if mapping:
+            replaced = replaced.replace(mapping)
+
+    if replaced.dtype.name != "category":
+        for mapping in mappings:
+            if mapping:
+                col = col.replace(mapping)
+        return col
+
+    codes = replaced.cat.codes.to_numpy()
+    if replaced.dtype == col.dtype and (codes == np.arange(n_categories)).all():
+        return col
+
+    # Last entry maps missing values (code -1) to missing values
+    recode = np.append(codes, -1)
+    values = pd.Categorical.from_codes(
+        recode[col.cat.codes.to_numpy()], dtype=replaced.dtype
+    )
+    return pd.Series(values, index=col.index, name=col.name)
+
+
 def set_types_file(
     panel,
     rename_df,
@@ -175,11 +315,9 @@ def set_types_file(
         pandas.DataFrame: The dataframe with the new types assigned.
 
     """
-    out = panel.copy()
-
     if "type" in rename_df.columns:
         out = _set_types_file_with_file(
-            panel=out,
+            panel=panel,
             rename_df=rename_df,
             cat_sep=cat_sep,
             int_to_float=int_to_float,
@@ -188,14 +326,17 @@ def set_types_file(
             scale_as_category=scale_as_category,
         )
     else:
-        for var in out.columns.values:
-            out.loc[:, var] = _set_inferred_types(
-                out[var],
+        columns = {
+            var: _set_inferred_types(
+                panel[var],
                 int_to_float=int_to_float,
                 bool_to_float=bool_to_float,
                 num_str_categorical=num_str_categorical,
                 few_int_to_cat=few_int_to_cat,
             )
+            for var in panel.columns
+        }
+        out = _assemble_columns(panel, columns)
     for i in ["personal_id", "year"]:
         if i in out:
             out[i] = out[i].astype("int")
@@ -203,6 +344,13 @@ def set_types_file(
     return out
 
 
+def _assemble_columns(panel, columns):
+    """Build a dataframe with the index of *panel* from a dict of columns."""
+    out = pd.concat(columns, axis=1) if columns else panel.copy()
+    out.columns.name = panel.columns.name
+    return out
+
+
 def _set_inferred_types(
     col,
     num_str_categorical=18,
@@ -210,39 +358,64 @@ def _set_inferred_types(
     bool_to_float=False,
     few_int_to_cat=True,
 ):
-    out_col = col.copy()
-    inf_type = infer_dtype(out_col, skipna=True)
+    out_col, expected_type = _infer_type(
+        col,
+        num_str_categorical=num_str_categorical,
+        int_to_float=int_to_float,
+        bool_to_float=bool_to_float,
+        few_int_to_cat=few_int_to_cat,
+    )
+    try:
+        out_col = out_col.astype(expected_type)
+    except Exception:
+        frameinfo = getframeinfo(currentframe())
+        module_name = frameinfo.filename
+        lineno = frameinfo.lineno - 1
+        message = f"{out_col.name} cannot be converted to inferred type."
+        swtl(message=message, module_name=module_name, lineno=lineno)
+        warnings.warn(
+            message,
+            UserWarning,
+        )
+    return out_col
+
+
+def _infer_type(col, num_str_categorical, int_to_float, bool_to_float, few_int_to_cat):
+    """Infer the type of *col*.
+
+    Returns:
+        tuple: The column to be converted, possibly parsed to numbers, and the
+            inferred type.
+
+    """
+    inf_type = infer_dtype(col, skipna=True)
     expected_type = None
     if inf_type in ("string", "mixed-integer", "mixed"):
         try:
-            out_col = pd.to_numeric(out_col)
-            inf_type = infer_dtype(out_col)
+            col = pd.to_numeric(col)
+            inf_type = infer_dtype(col)
         except ValueError:
-            if len(col.unique()) <= num_str_categorical:
+            if col.nunique(dropna=False) <= num_str_categorical:
                 expected_type = "category"
             else:
                 expected_type = "object"
 
     if inf_type in ("floating", "mixed-integer-float", "integer"):
+        values = np.asarray(col.dropna().unique(), dtype="float64")
 
         # Check if all values are integer
-        if all(
-            isinstance(x, (int, np.integer)) or x.is_integer()
-            for x in out_col.dropna().unique()
-        ):
+        if np.isfinite(values).all() and (np.mod(values, 1) == 0).all():
 
             # Dummy variable (only 0 and 1)
-            if sorted(out_col.dropna().unique()) == [0, 1]:
+            if np.array_equal(np.sort(values), [0, 1]):
                 expected_type = "float64" if bool_to_float else "boolean"
 
             # limited number of integer values (potentially convert to cat)
             elif few_int_to_cat and (
-                all(x in range(11) for x in out_col.dropna().unique())
-                or all(x in range(1990, 2030) for x in out_col.dropna().unique())
+                np.all((values >= 0) & (values <= 10))
+                or np.all((values >= 1990) & (values < 2030))
             ):
                 expected_type = "category"
-                category_ordered = True
-                category_labels = sorted(out_col.dropna().unique())
 
             # all other cases
             else:
@@ -254,12 +427,12 @@ def _set_inferred_types(
     elif inf_type == "categorical":
         expected_type = "category"
 
-    elif pd.isnull(expected_type) or inf_type in ("mixed"):
+    elif expected_type is None or inf_type == "mixed":
         frameinfo = getframeinfo(currentframe())
         module_name = frameinfo.filename
         lineno = frameinfo.lineno - 1
         message = (
-            f"{out_col.name} contains bad combination of values! Either"
+            f"{col.name} contains bad combination of values! Either"
             " further cleaning is required or an error occured"
         )
         swtl(message=message, module_name=module_name, lineno=lineno)
@@ -267,43 +440,8 @@ def _set_inferred_types(
             message,
             UserWarning,
         )
-        out_col = out_col.astype("object")
-    try:
-        if expected_type == "categorical" and category_labels:
-            out_col = pd.Categorical(out_col, category_labels, category_ordered)
-        else:
-            out_col = out_col.astype(expected_type)
-
-    except Exception:
-        frameinfo = getframeinfo(currentframe())
-        module_name = frameinfo.filename
-        lineno = frameinfo.lineno - 1
-        message = f"{out_col.name} cannot be converted to inferred type."
-        swtl(message=message, module_name=module_name, lineno=lineno)
-        warnings.warn(
-            message,
-            UserWarning,
-        )
-    return out_col
-
-
-def _fix_nas(df):
-    # Make sure columns contain only one type of missing
-    np_na = df.isin([np.nan]).any(axis=0)
-    pd_na = df.isin([pd.NA]).any(axis=0)
-    missing_both = np_na & pd_na
-    if missing_both.any():
-        df.loc[:, missing_both] = df.loc[:, missing_both].apply(
-            lambda x: np.array([_fix_nans(y) for y in x]), axis=0
-        )
-    return df
-
-
-def _fix_nans(x):
-    if pd.isna(x):
-        return np.nan
-    else:
-        return x
+        col = col.astype("object")
+    return col, expected_type
 
 
 def _set_types_file_with_file(
@@ -336,121 +474,42 @@ def _set_types_file_with_file(
         pandas.DataFrame: The dataframe with the new types assigned.
 
     """
-    out = panel.copy()
-
-    rename_df = rename_df.set_index("new_name")
-    rename_df["type"] = rename_df["type"].replace(
-        {
-            "int": "Int64",
-            "float": "float64",
-            "bool": "boolean",
-            "Categorical": "category",
-            "Int": "Int64",
-        }
+    type_plan = _compile_type_plan(
+        panel.columns,
+        rename_df,
+        cat_sep=cat_sep,
+        int_to_float=int_to_float,
+        bool_to_float=bool_to_float,
+        scale_as_category=scale_as_category,
     )
 
-    if scale_as_category:
-        rename_df["type"] = rename_df["type"].replace({"scale": "category"})
-    if int_to_float:
-        rename_df["type"] = rename_df["type"].replace({"Int64": "float64"})
-    if bool_to_float:
-        rename_df["type"] = rename_df["type"].replace({"boolean": "float64"})
+    # Convert columns that need no further treatment in one batch per type
+    columns = {}
+    batches = {}
+    for var, spec in type_plan.items():
+        if spec["scale"] is None and spec["categories"] is None:
+            batches.setdefault(spec["type"], []).append(var)
+    for expected_type, variables in batches.items():
+        try:
+            converted = panel[variables].astype(expected_type)
+        except Exception:
+            continue
+        for var in variables:
+            columns[var] = converted[var]
 
     errors = {}
     error_cats = {}
-    for var in out:
-        if var in rename_df.index and not pd.isna(rename_df.loc[var, "type"]):
-            expected_type = rename_df.loc[var, "type"]
-            # ToDo: Get rid of this? If not, document better
-            if expected_type == "scale":
-                cats_scale = rename_df.loc[var, "categories_english"].split(cat_sep)
-                replace_dict = dict(zip(cats_scale, np.arange(0, len(cats_scale))))
-                try:
-                    out[var] = out[var].replace(replace_dict)
-                except TypeError:
-                    try:
-                        cats_scale = [int(s) for s in cats_scale]
-                        replace_dict = dict(
-                            zip(cats_scale, np.arange(0, len(cats_scale)))
-                        )
-                        out[var].replace(replace_dict, inplace=True)
-                    except Exception:
-                        frameinfo = getframeinfo(currentframe())
-                        module_name = frameinfo.filename
-                        lineno = frameinfo.lineno - 1
-                        message = f"Problem converting to scale var: {var}"
-                        warnings.warn(message)
-                        swtl(message=message, module_name=module_name, lineno=lineno)
-                if int_to_float:
-                    expected_type = "float64"
-                else:
-                    expected_type = "Int64"
-
-            try:
-                out[var] = out[var].astype(expected_type)
-            except TypeError:
-                frameinfo = getframeinfo(currentframe())
-                module_name = frameinfo.filename
-                lineno = frameinfo.lineno - 1
-                message = f"could not convert {var} to {expected_type}"
-                warnings.warn(message)
-                swtl(message=message, module_name=module_name, lineno=lineno)
-            except Exception:
-                frameinfo = getframeinfo(currentframe())
-                module_name = frameinfo.filename
-                lineno = frameinfo.lineno - 1
-                message = (
-                    f"unexpected error converting the type of {var} to {expected_type}"
-                )
-                warnings.warn(message)
-                swtl(message=message, module_name=module_name, lineno=lineno)
-
-            if (
-                expected_type == "category"
-                and rename_df.loc[var, "categories_english"]
-                == rename_df.loc[var, "categories_english"]
-            ):
-                try:
-                    cats = [
-                        int(s)
-                        for s in rename_df.loc[var, "categories_english"].split(cat_sep)
-                    ]
-                except Exception:
-                    cats = rename_df.loc[var, "categories_english"].split(cat_sep)
-
-                missing_in_renaming = [
-                    c for c in out[var].unique() if c not in cats and not pd.isna(c)
-                ]
-                if len(missing_in_renaming) > 0:
-                    errors[var] = missing_in_renaming
-                    error_cats[var] = cats
-
-                if rename_df.loc[var, "ordered"] == rename_df.loc[var, "ordered"]:
-                    ordered = rename_df.loc[var, "ordered"]
-                else:
-                    ordered = False
-                try:
-                    out[var].cat.set_categories(
-                        cats,
-                        ordered=ordered,
-                        inplace=True,
-                    )
-                except Exception:
-                    frameinfo = getframeinfo(currentframe())
-                    module_name = frameinfo.filename
-                    lineno = frameinfo.lineno - 1
-                    message = (
-                        f"for {out[var]} there is an error in the "
-                        "categories specified in the file"
-                    )
-                    swtl(message=message, module_name=module_name, lineno=lineno)
-
-                    warnings.warn(message, UserWarning)
-
+    for var in panel:
+        if var in columns:
+            continue
+        elif var in type_plan:
+            columns[var] = _set_type_from_plan(
+                panel[var], type_plan[var], errors, error_cats
+            )
         # If no type specified, infer it
         else:
-            out.loc[:, var] = _set_inferred_types(
-                out[var],
+            columns[var] = _set_inferred_types(
+                panel[var],
                 int_to_float=int_to_float,
                 bool_to_float=bool_to_float,
                 num_str_categorical=num_str_categorical,
@@ -467,7 +526,119 @@ def _set_types_file_with_file(
         )
         raise ValueError(error_message)
 
-    return out
+    return _assemble_columns(panel, {var: columns[var] for var in panel})
+
+
+def _compile_type_plan(
+    columns, rename_df, cat_sep, int_to_float, bool_to_float, scale_as_category
+):
+    """Look up the target type of all *columns* with a type in the renaming file.
+
+    Returns:
+        dict: Maps the variables to dicts with the keys "type", "scale" (the
+            labels of scale variables), "categories" and "ordered".
+
+    """
+    specs = rename_df.set_index("new_name")
+    specs = specs.loc[specs.index.isin(columns) & specs["type"].notna()]
+
+    types = specs["type"].replace(_TYPE_ALIASES)
+    if scale_as_category:
+        types = types.replace({"scale": "category"})
+    if int_to_float:
+        types = types.replace({"Int64": "float64"})
+    if bool_to_float:
+        types = types.replace({"boolean": "float64"})
+
+    if "ordered" in specs:
+        ordered = specs["ordered"]
+    else:
+        ordered = pd.Series(np.nan, index=specs.index)
+
+    type_plan = {}
+    for var, expected_type, cats_english, is_ordered in zip(
+        specs.index, types, specs["categories_english"], ordered
+    ):
+        spec = {"type": expected_type, "scale": None, "categories": None}
+        # ToDo: Get rid of this? If not, document better
+        if expected_type == "scale":
+            spec["scale"] = cats_english.split(cat_sep)
+            spec["type"] = "float64" if int_to_float else "Int64"
+        elif expected_type == "category" and not pd.isna(cats_english):
+            try:
+                spec["categories"] = [int(s) for s in cats_english.split(cat_sep)]
+            except Exception:
+                spec["categories"] = cats_english.split(cat_sep)
+            spec["ordered"] = is_ordered if is_ordered == is_ordered else False
+        type_plan[var] = spec
+
+    return type_plan
+
+
+def _set_type_from_plan(col, spec, errors, error_cats):
+    """Convert *col* to the type in *spec*, collecting unknown categories."""
+    var = col.name
+    expected_type = spec["type"]
+    if spec["scale"] is not None:
+        cats_scale = spec["scale"]
+        replace_dict = dict(zip(cats_scale, np.arange(0, len(cats_scale))))
+        try:
+            col = col.replace(replace_dict)
+        except TypeError:
+            try:
+                cats_scale = [int(s) for s in cats_scale]
+                replace_dict = dict(zip(cats_scale, np.arange(0, len(cats_scale))))
+                col = col.replace(replace_dict)
+            except Exception:
+                frameinfo = getframeinfo(currentframe())
+                module_name = frameinfo.filename
+                lineno = frameinfo.lineno - 1
+                message = f"Problem converting to scale var: {var}"
+                warnings.warn(message)
+                swtl(message=message, module_name=module_name, lineno=lineno)
+
+    try:
+        col = col.astype(expected_type)
+    except TypeError:
+        frameinfo = getframeinfo(currentframe())
+        module_name = frameinfo.filename
+        lineno = frameinfo.lineno - 1
+        message = f"could not convert {var} to {expected_type}"
+        warnings.warn(message)
+        swtl(message=message, module_name=module_name, lineno=lineno)
+    except Exception:
+        frameinfo = getframeinfo(currentframe())
+        module_name = frameinfo.filename
+        lineno = frameinfo.lineno - 1
+        message = f"unexpected error converting the type of {var} to {expected_type}"
+        warnings.warn(message)
+        swtl(message=message, module_name=module_name, lineno=lineno)
+
+    if spec["categories"] is not None:
+        cats = spec["categories"]
+        known = set(cats)
+        missing_in_renaming = [
+            c for c in col.unique() if not pd.isna(c) and c not in known
+        ]
+        if len(missing_in_renaming) > 0:
+            errors[var] = missing_in_renaming
+            error_cats[var] = cats
+
+        try:
+            col = col.cat.set_categories(cats, ordered=spec["ordered"])
+        except Exception:
+            frameinfo = getframeinfo(currentframe())
+            module_name = frameinfo.filename
+            lineno = frameinfo.lineno - 1
+            message = (
+                f"for {col} there is an error in the "
+                "categories specified in the file"
+            )
+            swtl(message=message, module_name=module_name, lineno=lineno)
+
+            warnings.warn(message, UserWarning)
+
+    return col
 
 
 def convert_time_cols(panel, cols):
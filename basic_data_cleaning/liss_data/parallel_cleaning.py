@@ -0,0 +1,130 @@
+"""
+Clean several LISS data sets concurrently on a pool of worker processes.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from pathlib import Path
+
+from liss_data.utils_liss_data import get_traceback
+
+# Rough ratio of peak memory during cleaning to the size of the raw .dta files.
+MEMORY_PER_RAW_BYTE = 3
+
+
+def prepare_panels_in_parallel(jobs, n_workers, memory_limit_gb, log_path):
+    """Run prepare_panel for each job on *n_workers* processes.
+
+    A job cleans one data set and saves it in all its formats one after the
+    other, such that no two processes write the intermediate files of the same
+    data set. Jobs are started from the largest to the smallest, such that the
+    total run time is bounded by the slowest data set. A job is only started if
+    the estimated memory of all running jobs stays below *memory_limit_gb*,
+    which keeps large panels like background and time use from running
+    together. A job that exceeds the limit on its own runs alone.
+
+    The warnings of each job are logged to a separate file and appended to
+    *log_path* in the order of *jobs* once all jobs are done.
+
+    Args:
+        jobs (list): tuples (data_set_name, out_formats, file_paths)
+        n_workers (int): number of worker processes
+        memory_limit_gb (float): limit for the estimated memory of running jobs
+        log_path (pathlib.Path or string): file the warnings are appended to
+
+    """
+    memory_limit = memory_limit_gb * 1024**3
+    with tempfile.TemporaryDirectory() as log_dir:
+        job_logs = [os.path.join(log_dir, f"{i}.log") for i in range(len(jobs))]
+        pending = sorted(
+            range(len(jobs)), key=lambda i: _estimate_memory(jobs[i]), reverse=True
+        )
+        running = {}
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                while pending or running:
+                    for i in _select_jobs(
+                        pending, running, jobs, n_workers, memory_limit
+                    ):
+                        pending.remove(i)
+                        future = executor.submit(_prepare_panel, *jobs[i], job_logs[i])
+                        running[future] = i
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                        future.result()
+        finally:
+            _gather_logs(job_logs, log_path)
+
+
+def _select_jobs(pending, running, jobs, n_workers, memory_limit):
+    """Select the pending jobs that can be started now."""
+    selected = []
+    memory = sum(_estimate_memory(jobs[i]) for i in running.values())
+    for i in pending:
+        if len(running) + len(selected) >= n_workers:
+            break
+        job_memory = _estimate_memory(jobs[i])
+        if memory + job_memory <= memory_limit or not (running or selected):
+            selected.append(i)
+            memory += job_memory
+    return selected
+
+
+def _estimate_memory(job):
+    _, _, file_paths = job
+    return MEMORY_PER_RAW_BYTE * sum(os.path.getsize(f) for f in file_paths)
+
+
+def is_outdated(depends_on, produces):
+    """Return True if a product is missing or older than one of the dependencies.
+
+    Args:
+        depends_on (list): paths of the dependencies
+        produces (list): paths of the products
+
+    """
+    products = [Path(p) for p in produces]
+    if not all(p.exists() for p in products):
+        return True
+    oldest_product = min(p.stat().st_mtime for p in products)
+    return any(Path(d).stat().st_mtime > oldest_product for d in depends_on)
+
+
+def _prepare_panel(data_set_name, out_formats, file_paths, job_log):
+    """Clean one data set in a worker process and log its warnings to *job_log*."""
+    # Import here, the task module imports this module
+    from liss_data.task_clean_one_dataset import prepare_panel
+
+    # Replace the handlers inherited from the parent or a previous job such that
+    # send_warnings_to_log writes to the log file of this job.
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    logging.basicConfig(level=logging.INFO, filename=job_log)
+
+    try:
+        for out_format in out_formats:
+            prepare_panel(out_format, file_paths, data_set_name)
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except Exception as e:
+        print(f"\n\nUnexpected error in: {data_set_name}\n\n")
+        print(get_traceback())
+        raise e
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+
+def _gather_logs(job_logs, log_path):
+    with open(log_path, "a") as log:
+        for job_log in job_logs:
+            if os.path.isfile(job_log):
+                with open(job_log) as f:
+                    log.write(f.read())
@@ -1,19 +1,29 @@
+import hashlib
 import os
 import re
 import warnings
 from importlib import import_module
 from inspect import currentframe
 from inspect import getframeinfo
+from pathlib import Path
 
 import pandas as pd
 import pytask
-import yaml
 from config import FILE_FORMATS_LISS
 from config import IN_DATA_LISS
 from config import IN_SPECS_LISS
+from config import MEMORY_LIMIT_GB_LISS
+from config import N_WORKERS_LISS
 from config import OUT_DATA_LISS
+from config import OUT_FILES_CACHE
+from liss_data import utils_liss_data
+from liss_data.parallel_cleaning import is_outdated
+from liss_data.parallel_cleaning import prepare_panels_in_parallel
+from liss_data.utils_liss_data import file_hash
 from liss_data.utils_liss_data import get_traceback  # noqa
 from liss_data.utils_liss_data import load_data_set_and_specs  # noqa
+from liss_data.utils_liss_data import load_or_compute_pickle
+from liss_data.utils_liss_data import load_spec_yaml
 from liss_data.utils_liss_data import read_stata  # noqa
 from liss_data.utils_liss_data import save_panel  # noqa
 from liss_data.utils_liss_data import send_warnings_to_log as swtl
@@ -21,8 +31,12 @@ from liss_data.utils_liss_data import send_warnings_to_log as swtl
 pd.options.mode.chained_assignment = "raise"
 
 
-with open(IN_SPECS_LISS / "data_sets_specs.yaml") as f:
-    dir_dict = yaml.safe_load(f)
+dir_dict = load_spec_yaml(IN_SPECS_LISS / "data_sets_specs.yaml")
+
+# Cached files have to be read again if the code reading them changes
+_READING_CODE_HASH = "|".join(
+    file_hash(path) for path in [Path(__file__), Path(utils_liss_data.__file__)]
+)
 
 
 PARAMETRIZATION = []
@@ -82,18 +96,17 @@ for directory in dir_dict:
 
 def _common_cleaning(panel):
     """Some data cleaning conducted on all data sets."""
-    panel = panel.copy()
+    panel = panel.copy(deep=False)
 
     # Remove some characters from all strings
     str_col = list(panel.select_dtypes(include=["object"]).columns)
 
     for c in str_col:
-        # Replace line breaks in free text answers
-        panel[c] = panel[c].replace("\n", " ", regex=True)
-        panel[c] = panel[c].replace("\r", " ", regex=True)
-
-        # Replace all semicolons (important to save it as .csv)
-        panel[c] = panel[c].replace(";", ",", regex=True)
+        # Replace line breaks in free text answers and all semicolons
+        # (important to save it as .csv)
+        panel[c] = (
+            panel[c].replace("[\n\r]", " ", regex=True).replace(";", ",", regex=True)
+        )
 
     # convert personal_id to int
     panel["personal_id"] = panel["personal_id"].astype(int)
@@ -130,43 +143,9 @@ def prepare_panel(out_format, file_paths, data_set_name):
             warnings.warn(message)
             swtl(message=message, module_name=module_name, lineno=lineno)
         else:
-            vars_to_keep = list(rename_df[file_name].dropna())
-            data = read_stata(
-                file_path,
-                convert_categoricals=True,
-                vars_to_keep=vars_to_keep,
-                renaming_complete=(file_name == "xyx-corona-questionnaire"),
+            data = _load_renamed_file(
+                file_path, file_name, wave, data_set_name, rename_df, specs
             )
-
-            # rename vars
-            rename_dict = rename_df.set_index(file_name)["new_name"].to_dict()
-            data = data.rename(columns=rename_dict)
-
-            if wave is not None:
-                data["wave"] = wave
-
-            # Calc year (if multiple files per year exist, keep months)
-            assert "date_fieldwork" in data
-            if specs["multiple_files_per_year"]:
-                year = (
-                    data[data["date_fieldwork"].notnull()]["date_fieldwork"]
-                    .astype(int)
-                    .mode()[0]
-                )
-            else:
-                year = (
-                    data[data["date_fieldwork"].notnull()]["date_fieldwork"]
-                    .apply(lambda x: int(x / 100))
-                    .mode()[0]
-                )
-
-            data["year"] = year
-            if any(data.columns.duplicated()):
-                msg = (
-                    f"The columns {data.columns[data.columns.duplicated()]}"
-                    + f" in wave {wave} are duplicated"
-                )
-                raise ValueError(msg)
             data_set_list.append(data)
 
     # Put panel data_set together
@@ -219,6 +198,85 @@ def prepare_panel(out_format, file_paths, data_set_name):
     save_panel(panel=panel, file_name=specs["file_name"], out_format=out_format)
 
 
+def _load_renamed_file(file_path, file_name, wave, data_set_name, rename_df, specs):
+    """Load one file of a data set after renaming and adding wave and year.
+
+    The result is cached with a key consisting of the hash of the file, of
+    its column in the renaming file and of the code reading and renaming it,
+    such that only new or changed files are read again when the data set is
+    cleaned. Older cache entries of the file are removed.
+
+    """
+    rename_cols = rename_df[["new_name", file_name]].dropna(subset=[file_name])
+    key = hashlib.sha256(
+        "|".join(
+            [
+                file_hash(file_path),
+                rename_cols.to_csv(index=False),
+                str(wave),
+                str(specs["multiple_files_per_year"]),
+                pd.__version__,
+                _READING_CODE_HASH,
+            ]
+        ).encode()
+    ).hexdigest()[:16]
+
+    cache_dir = OUT_FILES_CACHE / data_set_name
+    file_stem = os.path.splitext(file_name)[0]
+    cache_path = cache_dir / f"{file_stem}-{key}.pickle"
+    for old_cache_path in cache_dir.glob(f"{file_stem}-*.pickle"):
+        if old_cache_path != cache_path:
+            old_cache_path.unlink()
+
+    return load_or_compute_pickle(
+        cache_path,
+        compute=lambda: _read_and_rename_file(
+            file_path, file_name, wave, rename_df, specs
+        ),
+    )
+
+
+def _read_and_rename_file(file_path, file_name, wave, rename_df, specs):
+    vars_to_keep = list(rename_df[file_name].dropna())
+    data = read_stata(
+        file_path,
+        convert_categoricals=True,
+        vars_to_keep=vars_to_keep,
+        renaming_complete=(file_name == "xyx-corona-questionnaire"),
+    )
+
+    # rename vars
+    rename_dict = rename_df.set_index(file_name)["new_name"].to_dict()
+    data = data.rename(columns=rename_dict)
+
+    if wave is not None:
+        data["wave"] = wave
+
+    # Calc year (if multiple files per year exist, keep months)
+    assert "date_fieldwork" in data
+    if specs["multiple_files_per_year"]:
+        year = (
+            data[data["date_fieldwork"].notnull()]["date_fieldwork"]
+            .astype(int)
+            .mode()[0]
+        )
+    else:
+        year = (
+            data[data["date_fieldwork"].notnull()]["date_fieldwork"]
+            .apply(lambda x: int(x / 100))
+            .mode()[0]
+        )
+
+    data["year"] = year
+    if any(data.columns.duplicated()):
+        msg = (
+            f"The columns {data.columns[data.columns.duplicated()]}"
+            + f" in wave {wave} are duplicated"
+        )
+        raise ValueError(msg)
+    return data
+
+
 #
 # def _get_file_paths(data_set):
 #     with open(OUT_DATA_LISS / "dir_to_parameters.json") as file:
@@ -237,16 +295,68 @@ def prepare_panel(out_format, file_paths, data_set_name):
 #     return my_directory, file_paths, my_specs, out_format
 
 
-@pytask.mark.parametrize(
-    "depends_on, produces, data_set_name, file_format", PARAMETRIZATION
-)
-def task_prepare_panel(depends_on, produces, data_set_name, file_format):
-    file_paths = [depends_on[k] for k in depends_on if k.startswith("file_path_")]
-    try:
-        prepare_panel(file_format, file_paths, data_set_name)
-    except (KeyboardInterrupt, SystemExit):
-        raise
-    except Exception as e:
-        print(f"\n\nUnexpected error in: {data_set_name}\n\n")
-        print(get_traceback())
-        raise e
+def _get_file_paths(depends_on):
+    return [depends_on[k] for k in depends_on if k.startswith("file_path_")]
+
+
+# Code all data sets depend on besides the modules in their dependencies
+TASK_CODE = [Path(__file__), Path(__file__).parent / "parallel_cleaning.py"]
+
+
+def _task_path(path):
+    """Resolve *path* relative to this module as pytask does."""
+    return Path(__file__).parent / path
+
+
+if N_WORKERS_LISS > 1:
+    # One job per data set with the dependencies and products of all its formats
+    JOBS = {}
+    for deps, target, data_set_name, file_format in PARAMETRIZATION:
+        job = JOBS.setdefault(
+            data_set_name, {"depends_on": {}, "produces": {}, "formats": []}
+        )
+        job["depends_on"].update(deps)
+        job["produces"].update(target)
+        job["formats"].append(file_format)
+
+    DEPENDS_ON_ALL = {
+        k: v for job in JOBS.values() for k, v in job["depends_on"].items()
+    }
+    DEPENDS_ON_ALL["parallel_cleaning"] = "parallel_cleaning.py"
+    PRODUCES_ALL = {k: v for job in JOBS.values() for k, v in job["produces"].items()}
+
+    @pytask.mark.depends_on(DEPENDS_ON_ALL)
+    @pytask.mark.produces(PRODUCES_ALL)
+    def task_prepare_panels_parallel(depends_on, produces):
+        # pytask reruns this task if any data set changed, but only the data sets
+        # whose own dependencies changed are cleaned again.
+        jobs = [
+            (data_set_name, job["formats"], _get_file_paths(job["depends_on"]))
+            for data_set_name, job in JOBS.items()
+            if is_outdated(
+                [_task_path(d) for d in job["depends_on"].values()] + TASK_CODE,
+                list(job["produces"].values()),
+            )
+        ]
+        prepare_panels_in_parallel(
+            jobs,
+            n_workers=N_WORKERS_LISS,
+            memory_limit_gb=MEMORY_LIMIT_GB_LISS,
+            log_path="warnings.log",
+        )
+
+else:
+
+    @pytask.mark.parametrize(
+        "depends_on, produces, data_set_name, file_format", PARAMETRIZATION
+    )
+    def task_prepare_panel(depends_on, produces, data_set_name, file_format):
+        file_paths = _get_file_paths(depends_on)
+        try:
+            prepare_panel(file_format, file_paths, data_set_name)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception as e:
+            print(f"\n\nUnexpected error in: {data_set_name}\n\n")
+            print(get_traceback())
+            raise e
@@ -3,6 +3,7 @@ import pandas as pd
 import pytask
 from config import FILE_FORMATS_LISS
 from config import OUT_DATA_LISS
+from liss_data.utils_liss_data import household_aggregates
 from liss_data.utils_liss_data import save_panel  # noqa
 
 pd.options.mode.chained_assignment = "raise"
@@ -42,9 +43,12 @@ def task_hh_level_assets(depends_on, produces):
         "total_financial_assets",
         "wealth_excl_housing",
     ]
-    res = data.groupby(["hh_id", "year"])[fin_vars].sum()
-    res.columns = [c + "_hh" for c in res]
-    res["hh_members"] = background.groupby(["hh_id", "year"])["hh_members"].first()
+    res = household_aggregates(
+        data, {c + "_hh": (c, "sum") for c in fin_vars}, by=["hh_id", "year"]
+    )
+    res["hh_members"] = household_aggregates(
+        background, {"hh_members": ("hh_members", "first")}, by=["hh_id", "year"]
+    )["hh_members"]
     for c in fin_vars:
         res[c + "_hh_equiv"] = res[c + "_hh"] / np.sqrt(res["hh_members"])
 
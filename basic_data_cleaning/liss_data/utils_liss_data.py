@@ -2,20 +2,44 @@
 This file contains some functions that are shared
 across cleaning modules
 """
+import functools
+import hashlib
+import json
 import logging
-import math
 import os
+import pickle
 import sys
 import warnings
 from inspect import currentframe
 from inspect import getframeinfo
+from pathlib import Path
 from traceback import format_exception
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 from config import IN_SPECS_LISS
 from config import OUT_DATA_LISS
+from config import OUT_SPECS_CACHE
+from pandas.api.types import infer_dtype
+from pandas.api.types import is_numeric_dtype
+
+PARQUET_ROW_GROUP_SIZE = 50000
+PARQUET_METADATA_KEY = b"liss_dtypes"
+
+# Number of rows written to csv files at once
+CSV_CHUNK_SIZE = 10000
+
+# Number of cells pandas formats at once in DataFrame.to_csv
+PANDAS_CSV_CHUNK_CELLS = 100000
+
+# Replacements of the separator in strings written to csv files
+CSV_SEPARATOR_REPLACEMENTS = {";": ",", "\t": " "}
+
+# Patterns in strings that cannot be read by Stata and their replacements
+STATA_REPLACEMENTS = [("€", "EUR"), ("\u2019", "'"), ("nan", "")]
 
 
 def read_stata(
@@ -24,56 +48,68 @@ def read_stata(
     vars_to_keep,
     start_year=None,
     renaming_complete=False,
+    chunksize=10000,
 ):
     """Emulate pd.read_stata() that takes care of duplicate entries for
     convert_categoricals=True.
 
+    The header and the value labels are parsed only once and only the columns
+    in *vars_to_keep* are decoded. Rows are read in chunks of *chunksize* such
+    that the full width of wide questionnaires is never held in memory at once.
+
     Args:
         file_path (string): path to file
         convert_categoricals (boolean): Read value labels and convert columns
                                         to Categorical/Factor variables.
         vars_to_keep (list): columns that should be kept
         start_year: all observations before this year are dropped
+        chunksize (int): number of rows decoded at once. If None, all rows
+                         are read in one go.
 
 
     Returns:
         DataFrame: loaded file
     """
+    with pd.io.stata.StataReader(file_path, convert_categoricals=False) as reader:
+        varlist = reader.varlist
+        missing_from_data = [x for x in vars_to_keep if x not in varlist]
+        missing_from_rename = [x for x in varlist if x not in vars_to_keep]
+
+        # Raise error if expected variable not in data
+        if len(missing_from_data) > 0:
+            raise KeyError(
+                f"Problem with {file_path}: the following variables "
+                "are specified in the renaming file, but not in the "
+                "dataset:\n\t" + "\n\t".join(missing_from_data)
+            )
+        # Raise error if expected variable not in renaming file
+        if len(missing_from_rename) > 0 and renaming_complete:
+            frameinfo = getframeinfo(currentframe())
+            module_name = frameinfo.filename
+            lineno = frameinfo.lineno - 1
+            message = (
+                f"Problem with {file_path}: the following "
+                "variables are not in the renaming table and as a consequence "
+                "dropped:\n\t" + "\n\t".join(missing_from_rename)
+            )
+            warnings.warn(message)
+            send_warnings_to_log(
+                message=message, module_name=module_name, lineno=lineno
+            )
 
-    data = pd.read_stata(file_path, convert_categoricals=False)
-    missing_from_data = [x for x in vars_to_keep if x not in data]
-    missing_from_rename = [x for x in data.columns if x not in vars_to_keep]
-
-    # Raise error if expected variable not in data
-    if len(missing_from_data) > 0:
-        raise KeyError(
-            f"Problem with {file_path}: the following variables "
-            "are specified in the renaming file, but not in the "
-            "dataset:\n\t" + "\n\t".join(missing_from_data)
-        )
-    # Raise error if expected variable not in renaming file
-    if len(missing_from_rename) > 0 and renaming_complete:
-        frameinfo = getframeinfo(currentframe())
-        module_name = frameinfo.filename
-        lineno = frameinfo.lineno - 1
-        message = (
-            f"Problem with {file_path}: the following "
-            "variables are not in the renaming table and as a consequence "
-            "dropped:\n\t" + "\n\t".join(missing_from_rename)
-        )
-        warnings.warn(message)
-        send_warnings_to_log(message=message, module_name=module_name, lineno=lineno)
+        if start_year:
+            raise NotImplementedError
 
-    # Select only subset of variables
-    data = data[[c for c in data if c in vars_to_keep]]
+        # Select only subset of variables
+        columns = [c for c in varlist if c in vars_to_keep]
+        data = _read_stata_columns(reader, columns, chunksize)
 
-    if start_year:
-        raise NotImplementedError
+        # Value labels can only be read once all rows are consumed
+        value_label_dict = reader.value_labels() if convert_categoricals else {}
 
     if convert_categoricals:
 
         # More general version to convert needed than the built-in one.
-        value_label_dict = pd.io.stata.StataReader(file_path).value_labels()
         for col in data:
             if col in value_label_dict:
                 cat_data = pd.Categorical(data[col], ordered=True)
@@ -89,6 +125,125 @@ def read_stata(
     return data
 
 
+def _read_stata_columns(reader, columns, chunksize):
+    """Read *columns* from an open StataReader, *chunksize* rows at a time."""
+    if chunksize is None or reader.nobs <= chunksize:
+        return reader.read(columns=columns)
+
+    # Stop exactly at the last row, reading past it closes the reader
+    chunks = [
+        reader.read(nrows=chunksize, columns=columns)
+        for _ in range(0, reader.nobs, chunksize)
+    ]
+    return pd.concat(chunks)
+
+
+def load_spec_yaml(path):
+    """Load a yaml specification file.
+
+    Args:
+        path (pathlib.Path): path to the yaml file
+
+    Returns:
+        dictionary: parsed file
+    """
+    return _load_spec_with_cache(path, kind="yaml", parse=_parse_yaml)
+
+
+def load_spec_csv(path):
+    """Load a semicolon separated specification file (e.g. a renaming file).
+
+    Args:
+        path (pathlib.Path): path to the csv file
+
+    Returns:
+        DataFrame: parsed file
+    """
+    return _load_spec_with_cache(path, kind="csv", parse=_parse_csv)
+
+
+def _load_spec_with_cache(path, kind, parse):
+    """Parse the specification file *path* or load the result from the cache.
+
+    The cache is keyed by a hash of the file content and of this module, which
+    contains the parsing and validation, so unchanged files are neither parsed
+    nor validated again across tasks. Older cache entries of the file are
+    removed. Cached objects are loaded from disk on every call such that
+    callers may modify them.
+
+    Args:
+        path (pathlib.Path): path to the specification file
+        kind (string): type of parsing, part of the cache key
+        parse (function): function that parses and validates *path*
+
+    Returns:
+        object: parsed specification
+    """
+    path = Path(path)
+    content_hash = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+    prefix = f"{path.stem}-{kind}-"
+    cache_path = OUT_SPECS_CACHE / (
+        f"{prefix}{content_hash}-{_parsing_code_hash()}-{pd.__version__}.pickle"
+    )
+    if not cache_path.exists():
+        for old_cache_path in OUT_SPECS_CACHE.glob(f"{prefix}*.pickle"):
+            try:
+                old_cache_path.unlink()
+            except FileNotFoundError:
+                pass
+    return load_or_compute_pickle(cache_path, compute=lambda: parse(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _parsing_code_hash():
+    """Return the hash of this module, which parses and validates the specs."""
+    return file_hash(Path(__file__))[:16]
+
+
+def load_or_compute_pickle(cache_path, compute):
+    """Load the pickled object at *cache_path* or compute and pickle it.
+
+    Args:
+        cache_path (pathlib.Path): path of the pickle file
+        compute (function): function without arguments that returns the object
+
+    Returns:
+        object: loaded or computed object
+    """
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    result = compute()
+
+    # Write to a temporary file first as tasks might run in parallel
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temp_path, "wb") as f:
+        pickle.dump(result, f)
+    os.replace(temp_path, cache_path)
+
+    return result
+
+
+def file_hash(path):
+    """Return the sha256 hash of the content of the file at *path*."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _parse_yaml(path):
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def _parse_csv(path):
+    return pd.read_csv(path, sep=";")
+
+
 def load_general_specs(data_set_name):
     """Load general specifications for one data set
 
@@ -98,14 +253,29 @@ def load_general_specs(data_set_name):
     Returns:
         dictionary: general specifications
     """
-    with open(IN_SPECS_LISS / "data_sets_specs.yaml") as fn:
-        specs = yaml.safe_load(fn)[data_set_name]
+    specs = load_spec_yaml(IN_SPECS_LISS / "data_sets_specs.yaml")[data_set_name]
 
     return specs
 
 
 def load_rename_df(data_set_name):
-    rename_df = pd.read_csv(IN_SPECS_LISS / f"{data_set_name}_renaming.csv", sep=";")
+    """Load the renaming file of one data set and check its validity.
+
+    Args:
+        data_set_name (string): name of data set
+
+    Returns:
+        DataFrame: renamed variables of the renaming file
+    """
+    return _load_spec_with_cache(
+        IN_SPECS_LISS / f"{data_set_name}_renaming.csv",
+        kind="renaming-checked",
+        parse=lambda path: _parse_rename_df(path, data_set_name),
+    )
+
+
+def _parse_rename_df(path, data_set_name):
+    rename_df = _parse_csv(path)
     rename_df = rename_df.dropna(subset=["new_name"])
 
     # Check validity of rename df
@@ -142,8 +312,7 @@ def load_data_set_and_specs(data_set_name, start_year=None):
     ]:
         replace_path = IN_SPECS_LISS / f"{data_set_name}_{cleaning_type}.yaml"
         if os.path.isfile(replace_path):
-            with open(replace_path) as file:
-                cleaning_specs[f"{cleaning_type}"] = yaml.safe_load(file)
+            cleaning_specs[f"{cleaning_type}"] = load_spec_yaml(replace_path)
 
     return specs, rename_df, cleaning_specs
 
@@ -198,85 +367,347 @@ def save_panel(panel, file_name, out_format):
                 OUT_DATA_LISS / (file_name + ".dta"), version=117
             )
     elif out_format == "csv":
-        panel.to_csv(OUT_DATA_LISS / (file_name + ".csv"), sep=";")
+        write_csv(panel, OUT_DATA_LISS / (file_name + ".csv"), sep=";")
 
     elif out_format == "parquet":
-        for c in [c for c in panel if panel[c].dtype == object]:
-            panel[c] = panel[c].astype("string")
-        panel.to_parquet(OUT_DATA_LISS / (file_name + ".parquet"))
+        write_parquet(panel, OUT_DATA_LISS / (file_name + ".parquet"))
     else:
         raise ValueError('"format" must be one of pickle, dta, csv, parquet')
 
 
-def variable_cleaning_for_dta(panel):
-    """Clean variables such that they can be exportet to Stata."""
-    # Change dtype of object variables
-    type_pref = [int, float, str]
-    for colname in list(panel.select_dtypes(include=["object"]).columns):
-        for t in type_pref:
-            try:
-                panel[colname] = panel[colname].astype(t)
-            except (ValueError, TypeError):
-                pass
+def write_parquet(df, path, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Write *df* to a parquet file such that read_parquet restores it.
 
-    for x in panel.dtypes.index:
-        if panel.dtypes[x].name == "object":
-            panel = panel.drop(columns=[x])
+    String categoricals, nullable dtypes and the (Multi)Index are kept via the
+    pandas metadata of pyarrow. Object columns are stored as strings. Their
+    names and the categories of categoricals with non-string categories are
+    saved in the file metadata to restore them when reading. Categories that
+    cannot be restored from their string representation are left to pyarrow.
 
-    # retype new boolean and integer types
-    for x in panel.dtypes.index:
-        if panel.dtypes[x].name in ["boolean", "Int64"]:
-            panel[x] = panel[x].astype("float")
+    Object columns may only contain strings and missing values, otherwise a
+    ValueError is raised since other values would be read back as strings.
 
-    # Replace characters that cannot be read by Stata
-    panel = panel.replace(["€"], ["EUR"], regex=True)
-    panel = panel.replace(["\u2019"], ["'"], regex=True)
-    panel = panel.replace(["nan"], [""], regex=True)
-    panel = panel.replace([None], [""], regex=True)
+    Args:
+        df (DataFrame): data to be saved
+        path (pathlib.Path): path of the parquet file
+        row_group_size (int): number of rows per row group. Smaller row groups
+            allow to skip more rows when reading with filters.
 
-    return panel
+    """
+    object_cols = [c for c in df if df[c].dtype == object]
+    not_strings = [
+        c for c in object_cols if infer_dtype(df[c]) not in ["string", "empty"]
+    ]
+    if not_strings:
+        raise ValueError(
+            f"Object columns {not_strings} contain values that are not strings and "
+            "cannot be saved to parquet. Convert them to one type first."
+        )
 
+    categories = {}
+    for c in df:
+        if df[c].dtype.name == "category" and df[c].cat.categories.dtype != object:
+            encoded = _encode_categories(df[c].cat.categories)
+            if encoded is not None:
+                categories[c] = [*encoded, bool(df[c].cat.ordered)]
 
-def merge_double_columns(df):
-    merge_cols = [x for x in df.columns if x[-6:] == "_merge"]
-    for col in merge_cols:
-        df[col[:-6]] = df.apply(lambda x: _merge_cols(x[col[:-6]], x[col]), axis=1)
-    df = df.drop(columns=merge_cols)
-    return df
+    df = df.copy(deep=False)
+    for c in object_cols:
+        df[c] = df[c].astype("string")
 
+    table = pa.Table.from_pandas(df)
+    liss_metadata = {"object_columns": object_cols, "categories": categories}
+    metadata = {
+        **table.schema.metadata,
+        PARQUET_METADATA_KEY: json.dumps(liss_metadata).encode(),
+    }
+    table = table.replace_schema_metadata(metadata)
+    pq.write_table(table, path, row_group_size=row_group_size)
 
-def update_double_columns(df):
-    update_cols = [x for x in df.columns if x[-7:] == "_update"]
-    for col in update_cols:
-        df[col[:-7]] = df.apply(lambda x: _update_cols(x[col[:-7]], x[col]), axis=1)
-    df = df.drop(columns=update_cols)
+
+def read_parquet(path, columns=None, filters=None):
+    """Read a parquet file written by write_parquet.
+
+    Args:
+        path (pathlib.Path): path of the parquet file
+        columns (list): columns to be loaded, all if None. Index columns are
+            always loaded.
+        filters (list): row filters in the pyarrow format, e.g.
+            [("year", "in", [2019, 2020])]. Row groups without matching rows are
+            skipped.
+
+    Returns:
+        DataFrame: loaded data
+    """
+    df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+
+    metadata = pq.read_schema(path).metadata or {}
+    liss_metadata = json.loads(metadata.get(PARQUET_METADATA_KEY, b"{}"))
+    for c in liss_metadata.get("object_columns", []):
+        if c in df:
+            df[c] = df[c].astype(object).where(df[c].notna(), np.nan)
+    for c, (values, dtype, ordered) in liss_metadata.get("categories", {}).items():
+        if c in df:
+            categories = _decode_categories(values, dtype)
+            df[c] = _as_dtype(df[c], categories.dtype).astype(
+                pd.CategoricalDtype(categories, ordered=ordered)
+            )
     return df
 
 
-def _merge_cols(x, y):
-    if type(x) == str:
-        return x
-    elif not math.isnan(x):
-        return x
-    elif type(y) == str:
-        return y
-    elif not math.isnan(y):
-        return y
+def _encode_categories(categories):
+    """Return json serializable values and the dtype of *categories*.
+
+    Numbers and booleans are kept, all other categories are converted to
+    strings. None is returned if the categories cannot be restored.
+
+    """
+    if categories.dtype.kind in "biuf":
+        values = categories.tolist()
     else:
-        return np.nan
-
-
-def _update_cols(x, y):
-    if type(y) == str:
-        return y
-    elif not math.isnan(y):
-        return y
-    elif type(x) == str:
-        return x
-    elif not math.isnan(x):
-        return x
+        values = categories.astype(str).tolist()
+    dtype = str(categories.dtype)
+    try:
+        restored = _decode_categories(values, dtype)
+    except (TypeError, ValueError):
+        return None
+    return (values, dtype) if restored.equals(categories) else None
+
+
+def _decode_categories(values, dtype):
+    """Restore categories encoded by _encode_categories."""
+    return pd.Index(values).astype(dtype)
+
+
+def _as_dtype(sr, dtype):
+    """Convert the dense values pyarrow returns for a categorical to *dtype*.
+
+    pyarrow returns timezone aware times in UTC without timezone and time deltas
+    as integers.
+
+    """
+    if sr.dtype.name == "category" or sr.dtype == dtype:
+        return sr
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        if sr.dt.tz is None:
+            sr = sr.dt.tz_localize("UTC")
+        return sr.dt.tz_convert(dtype.tz)
+    return sr.astype(dtype)
+
+
+def write_csv(df, path, sep=";", chunksize=CSV_CHUNK_SIZE, clean_strings=True):
+    """Write *df* to a utf-8 encoded csv file in chunks of rows.
+
+    Line breaks and the separator are removed from strings while writing, one
+    chunk at a time, such that no cleaned copy of the whole data is created.
+
+    DataFrame.to_csv itself formats the data in blocks of rows and chooses the
+    format of datetimes per block. The chunks are therefore a multiple of these
+    blocks, such that the file is the same as written by to_csv on the cleaned
+    data.
+
+    Args:
+        df (DataFrame): data to be saved
+        path (pathlib.Path): path of the csv file
+        sep (str): separator, ";" or "\\t"
+        chunksize (int): number of rows per chunk, rounded down to a multiple of
+            the rows to_csv formats at once
+        clean_strings (bool): remove line breaks and the separator from strings.
+            If False, the file is the same as written by DataFrame.to_csv.
+
+    """
+    pandas_chunksize = (PANDAS_CSV_CHUNK_CELLS // (len(df.columns) or 1)) or 1
+    chunksize = max(chunksize // pandas_chunksize, 1) * pandas_chunksize
+
+    sep_replacement = CSV_SEPARATOR_REPLACEMENTS[sep]
+    if clean_strings:
+        str_cols = [c for c in df if df[c].dtype.name in ["object", "string"]]
     else:
-        return np.nan
+        str_cols = []
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        for start in range(0, max(len(df), 1), chunksize):
+            chunk = df.iloc[start : start + chunksize].copy(deep=False)
+            for c in str_cols:
+                chunk[c] = (
+                    chunk[c]
+                    .replace("[\n\r]", " ", regex=True)
+                    .replace(sep, sep_replacement, regex=True)
+                )
+            chunk.to_csv(file, sep=sep, header=start == 0, chunksize=pandas_chunksize)
+
+
+def variable_cleaning_for_dta(panel):
+    """Clean variables such that they can be exportet to Stata.
+
+    Object columns are dropped and nullable boolean and integer columns are
+    converted to float. Characters that cannot be read by Stata are replaced in
+    string columns, all other columns are left untouched. *panel* is not
+    modified.
+
+    """
+    columns = {}
+    for col in panel:
+        sr = panel[col]
+        if sr.dtype.name == "object":
+            continue
+        elif sr.dtype.name in ["boolean", "Int64"]:
+            sr = sr.astype("float")
+        elif sr.dtype.name == "string":
+            for pattern, value in STATA_REPLACEMENTS:
+                sr = sr.str.replace(pattern, value, regex=True)
+            sr = sr.fillna("")
+        columns[col] = sr
+
+    if not columns:
+        return panel.drop(columns=panel.columns)
+    out = pd.concat(columns, axis=1)
+    out.columns.name = panel.columns.name
+    return out
+
+
+def merge_double_columns(df):
+    """Fill missing values of each column from its *_merge* counterpart."""
+    return _combine_double_columns(df, suffix="_merge", prefer_suffixed=False)
+
+
+def update_double_columns(df):
+    """Overwrite each column with the non-missing values of its *_update* column."""
+    return _combine_double_columns(df, suffix="_update", prefer_suffixed=True)
+
+
+def _combine_double_columns(df, suffix, prefer_suffixed):
+    """Combine all column pairs *col* and *col + suffix* into *col*.
+
+    For each row the first non-missing value is taken, starting with the
+    suffixed column if *prefer_suffixed* is True. The suffixed columns are dropped.
+
+    """
+    suffixed_cols = [x for x in df.columns if x.endswith(suffix)]
+    combined = {}
+    for col in suffixed_cols:
+        base = col[: -len(suffix)]
+        first, second = (df[col], df[base]) if prefer_suffixed else (df[base], df[col])
+        combined[base] = _first_non_missing(first, second)
+    df = df.drop(columns=suffixed_cols)
+    for base, values in combined.items():
+        df[base] = values
+    return df
+
+
+def _first_non_missing(first, second):
+    """Return *first* with its missing values filled from *second*.
+
+    Categorical columns stay categorical with the categories of both columns.
+    Other columns get the dtype inferred from the combined values.
+
+    """
+    if first.dtype.name == "category" or second.dtype.name == "category":
+        categories = pd.Index(
+            [*_categories_or_values(first), *_categories_or_values(second)]
+        ).unique()
+        ordered = (
+            first.dtype.name == "category"
+            and first.cat.ordered
+            and categories.equals(first.cat.categories)
+        )
+        dtype = pd.CategoricalDtype(categories, ordered=ordered)
+        return first.astype(dtype).fillna(second.astype(dtype))
+
+    if is_numeric_dtype(first) and is_numeric_dtype(second):
+        return first.where(first.notna(), second)
+
+    out = first.astype(object).where(first.notna(), second.astype(object))
+    return out.where(out.notna(), np.nan).infer_objects()
+
+
+def _categories_or_values(sr):
+    if sr.dtype.name == "category":
+        return sr.cat.categories
+    return sr.dropna().unique()
+
+
+def unify_missing_values(df, report=False):
+    """Make sure columns contain only one type of missing value.
+
+    Object columns that contain pd.NA together with other missing values
+    (np.nan, None) get np.nan for all missing values. Other dtypes can hold only
+    one type of missing value and are not checked. The columns are replaced in
+    *df*.
+
+    Args:
+        df (pandas.DataFrame): The dataframe to be checked.
+        report (bool): Print the names of the fixed columns.
+
+    Returns:
+        pandas.DataFrame: *df* with unified missing values.
+
+    """
+    for col in df.columns[(df.dtypes == object).to_numpy()]:
+        values = df[col].to_numpy()
+        na_mask = pd.isna(values)
+        if not na_mask.any():
+            continue
+
+        # The distinct missing values, at most one of each kind
+        kinds = pd.unique(values[na_mask])
+        if len(kinds) > 1 and any(x is pd.NA for x in kinds):
+            if report:
+                print(
+                    f"{col} contains two types of nans. Will be fixed. Should be"
+                    " checked!"
+                )
+            values = values.copy()
+            values[na_mask] = np.nan
+            df[col] = pd.Series(values, index=df.index).infer_objects()
+    return df
+
+
+def household_aggregates(df, aggregations, by="hh_id", min_count=0, broadcast=False):
+    """Aggregate several variables within households in one groupby.
+
+    Args:
+        df (pandas.DataFrame): individual level data.
+        aggregations (dict): keys are the names of the aggregated variables,
+            values are tuples (column, function) with function any groupby
+            aggregation such as "sum", "min", "max", "count" or "first".
+        by (str or list): columns or index levels identifying a household.
+        min_count (int): minimum number of non-missing values for a sum, the
+            sum is missing otherwise.
+        broadcast (bool): return the aggregates of each individual's household
+            with the index of *df* instead of one row per household.
+
+    Returns:
+        pandas.DataFrame: the aggregated variables.
+
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = [df[k] if k in df.columns else df.index.get_level_values(k) for k in by]
+    grouped = df.groupby(keys)
+
+    # Aggregate all variables with the same function at once
+    by_function = {}
+    for name, (col, function) in aggregations.items():
+        by_function.setdefault(function, {})[name] = col
+
+    parts = []
+    for function, names in by_function.items():
+        if function == "sum":
+            part = grouped[list(names.values())].sum(min_count=min_count)
+        else:
+            part = grouped[list(names.values())].agg(function)
+        part.columns = list(names)
+        parts.append(part)
+    res = pd.concat(parts, axis=1)[list(aggregations)]
+
+    if broadcast:
+        households = (
+            pd.Index(keys[0]) if len(keys) == 1 else pd.MultiIndex.from_arrays(keys)
+        )
+        res = res.reindex(households)
+        res.index = df.index
+
+    return res
 
 
 def get_traceback():
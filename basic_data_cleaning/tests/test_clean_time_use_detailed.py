@@ -0,0 +1,139 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from corona_preparation.clean_time_use_detailed import clean_hours_vars
+from corona_preparation.clean_time_use_detailed import hour_cols_2019
+from corona_preparation.clean_time_use_detailed import hour_cols_2020
+
+
+def _clean_hours_vars_column_by_column(data, hour_dict):
+    """The former clean_hours_vars which copied the data for each column."""
+    data = data.copy()
+    data["rescaled_hrs"] = False
+    for hrs in [*hour_dict]:
+        data = _remove_extreme_outlier(data, hrs, hour_dict)
+    data = _winsorize_outlier(data, hour_dict)
+    data = _rescaling(data, [*hour_dict])
+    new_hour_dict = {c: hour_dict[c][0:2] for c in hour_dict.keys()}
+    for hrs in [*new_hour_dict]:
+        data = _remove_extreme_outlier(data, hrs, new_hour_dict)
+    return data
+
+
+def _winsorize_outlier(data, hour_dict):
+    data = data.copy()
+    for hrs, cutoffs in hour_dict.items():
+        lower = cutoffs[0]
+        upper = cutoffs[1]
+
+        lower_bound = data[hrs] < lower
+        upper_bound = data[hrs] > upper
+        either = lower_bound | upper_bound
+
+        data.loc[lower_bound, hrs] = lower
+        data.loc[upper_bound, hrs] = upper
+
+        other_hours = [col for col in hour_dict.keys() if col != hrs]
+        rescaled = _rescaling(data, other_hours, sum_hours=168 - upper)
+        data.loc[upper_bound, other_hours + ["rescaled_hrs"]] = rescaled.loc[
+            upper_bound, other_hours + ["rescaled_hrs"]
+        ]
+
+        data[hrs + "_imputed"] = False
+        data.loc[either, hrs + "_imputed"] = True
+        data[hrs + "_imputed"] = data[hrs + "_imputed"].astype(float)
+
+        month = data.reset_index()["month"].unique()[0].astype(str)[0:10]
+        warnings.warn(
+            f"{month}: Winsorize {either.sum()} values"
+            "at {lower} and {upper} hours in column {hrs}"
+        )
+
+    impute_cols = [hrs + "_imputed" for hrs in hour_dict.keys()]
+    data["number_imputed_values_tu"] = data[impute_cols].sum(axis=1)
+    return data
+
+
+def _remove_extreme_outlier(data, col, hour_dict, up=True):
+    data = data.copy()
+    hour_cols = [*hour_dict]
+    cutoffs = hour_dict[col]
+
+    condition = data[col] > max(cutoffs) if up else data[col] < min(cutoffs)
+    drop = condition.sum()
+
+    if drop > 0:
+        month = data.reset_index()["month"].unique()[0].astype(str)[0:10]
+        warnings.warn(
+            f"{month}: Set {drop} obs to missing because of extreme values in {col}."
+        )
+        for hrs in hour_cols:
+            data.loc[condition, hrs] = np.nan
+    return data
+
+
+def _rescaling(data, hour_cols, sum_hours=168):
+    data = data.copy()
+    data["tot_hours"] = data[hour_cols].sum(axis=1)
+    data.loc[data[hour_cols].isna().all(axis=1), "tot_hours"] = np.nan
+
+    condition = data.tot_hours != sum_hours
+    data.loc[condition, "rescaled_hrs"] = True
+
+    for hrs in hour_cols:
+        data.loc[condition, hrs] = (
+            data.loc[condition, hrs] / data.loc[condition, "tot_hours"] * sum_hours
+        )
+    return data
+
+
+def _make_time_use(hour_dict, month, seed, n_obs=1000):
+    """Hours of one month with missing values, outliers and rows of zeros."""
+    rng = np.random.default_rng(seed)
+    hour_cols = [*hour_dict]
+    values = rng.gamma(2, 10, (n_obs, len(hour_cols)))
+    values[rng.random(values.shape) < 0.05] *= 8
+    values[rng.random(values.shape) < 0.2] = np.nan
+    if seed % 2:
+        # Integer answers hit the cutoffs exactly
+        values = np.round(values)
+    values[3] = np.nan
+    values[4] = 0
+    index = pd.MultiIndex.from_arrays(
+        [np.arange(n_obs), np.full(n_obs, pd.Timestamp(month))],
+        names=["personal_id", "month"],
+    )
+    data = pd.DataFrame(values, columns=hour_cols, index=index)
+    data["other"] = 1
+    return data
+
+
+def _messages(record):
+    return [
+        str(w.message)
+        for w in record
+        if "Winsorize" in str(w.message) or "to missing" in str(w.message)
+    ]
+
+
+@pytest.mark.parametrize(
+    "hour_dict, month, seed",
+    [(hour_cols_2019, "2019-11-01", seed) for seed in range(2)]
+    + [(hour_cols_2020, "2020-04-01", seed) for seed in range(2, 5)]
+    + [(hour_cols_2020, "2020-11-01", seed) for seed in range(5, 7)],
+)
+def test_clean_hours_vars_equals_column_by_column(hour_dict, month, seed):
+    data = _make_time_use(hour_dict, month, seed)
+
+    with warnings.catch_warnings(record=True) as record_expected:
+        warnings.simplefilter("always")
+        expected = _clean_hours_vars_column_by_column(data, hour_dict)
+    with warnings.catch_warnings(record=True) as record_result:
+        warnings.simplefilter("always")
+        result = clean_hours_vars(data, hour_dict)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    assert _messages(record_result) == _messages(record_expected)
+    assert any(f"{month}: Set" in m for m in _messages(record_result))
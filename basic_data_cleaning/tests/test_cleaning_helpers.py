@@ -0,0 +1,135 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from liss_data.cleaning_helpers import replace_values
+
+
+def _replace_values_step_by_step(panel, replace_dict, rename_df):
+    """The former implementation of replace_values.
+
+    Each variable, type group and multicolumn block is replaced with a separate
+    Series.replace in the order of the replacing dictionary.
+
+    """
+    out = panel.copy()
+    types = rename_df["type"].replace({"Categorical": "category"})
+    for group, mapping in replace_dict.get("type renaming", {}).items():
+        for col in rename_df.loc[types == group, "new_name"]:
+            try:
+                out[col] = out[col].replace(mapping)
+            except Exception:
+                warnings.warn(f"issue with {col}")
+
+    for var, mapping in replace_dict.get("replacing", {}).items():
+        try:
+            if var == "full_df":
+                out = out.replace(mapping)
+            else:
+                out[var] = out[var].replace(mapping)
+        except TypeError:
+            warnings.warn(f"type issue with {var}")
+
+    for group in replace_dict.get("multicolumn", {}).values():
+        cols = group["columns"]
+        try:
+            out.loc[:, cols] = out.loc[:, cols].replace(group["dictionary"])
+        except Exception:
+            warnings.warn(f"error in {group}")
+    return out
+
+
+@pytest.fixture
+def panel():
+    values = ["a", "b", "c", None, "a", "d"]
+    categories = ["a", "b", "c", "d"]
+    return pd.DataFrame(
+        {
+            "x_cat": pd.Categorical(values, categories=categories),
+            "y_cat": pd.Categorical(values, categories=categories[::-1], ordered=True),
+            "x_obj": pd.Series(values, dtype=object),
+            "y_obj": pd.Series(values, dtype=object),
+            "num": [1.0, 2.0, 3.0, np.nan, 1.0, 4.0],
+        }
+    )
+
+
+@pytest.fixture
+def rename_df():
+    return pd.DataFrame(
+        {
+            "new_name": ["x_cat", "y_cat", "x_obj", "y_obj", "num"],
+            "type": ["Categorical", "Categorical", "str", "str", "float"],
+        }
+    )
+
+
+SPECS = {
+    "chain": {"replacing": {"x": {"a": "b", "b": "c"}}},
+    "swap": {"replacing": {"x": {"a": "c", "c": "a"}}},
+    "chain_over_steps": {
+        "type renaming": {"category": {"a": "b"}},
+        "replacing": {"x": {"b": "c"}, "full_df": {"c": "d"}},
+    },
+    "swap_over_steps": {
+        "replacing": {"x": {"a": "c"}, "full_df": {"c": "a", "d": np.nan}},
+    },
+    "merge_and_remove": {"replacing": {"x": {"a": "d", "b": np.nan, "e": "f"}}},
+    "rename_and_chain": {"replacing": {"x": {"d": "z", "z": "a", "b": "y"}}},
+}
+
+
+def _expand(spec, suffix):
+    """Apply the replacing of variable "x" to the column x_<suffix>."""
+    spec = {key: dict(value) for key, value in spec.items()}
+    if "x" in spec.get("replacing", {}):
+        spec["replacing"] = {
+            (f"x_{suffix}" if var == "x" else var): mapping
+            for var, mapping in spec["replacing"].items()
+        }
+    return spec
+
+
+@pytest.mark.parametrize("suffix", ["cat", "obj"])
+@pytest.mark.parametrize("name", SPECS)
+def test_replace_values_same_as_step_by_step(panel, rename_df, name, suffix):
+    spec = _expand(SPECS[name], suffix)
+
+    expected = _replace_values_step_by_step(panel, spec, rename_df)
+    result = replace_values(panel, spec, rename_df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_replace_values_chained_categories(panel, rename_df):
+    spec = _expand(SPECS["chain"], "cat")
+
+    result = replace_values(panel, spec, rename_df)
+
+    assert result["x_cat"].tolist()[:4] == ["c", "c", "c", np.nan]
+
+
+def test_replace_values_multicolumn(panel, rename_df):
+    spec = {
+        "multicolumn": {
+            "group": {"columns": ["x_obj", "y_obj"], "dictionary": {"a": "b", "b": "a"}}
+        },
+        "replacing": {"x_obj": {"c": "a"}},
+    }
+
+    expected = _replace_values_step_by_step(panel, spec, rename_df)
+    result = replace_values(panel, spec, rename_df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_replace_values_does_not_modify_panel(panel, rename_df):
+    before = panel.copy()
+    replace_values(panel, _expand(SPECS["swap_over_steps"], "cat"), rename_df)
+    pd.testing.assert_frame_equal(panel, before)
+
+
+def test_replace_values_missing_variable(panel, rename_df):
+    with pytest.raises(ValueError, match="missing"):
+        replace_values(panel, {"replacing": {"unknown": {"a": "b"}}}, rename_df)
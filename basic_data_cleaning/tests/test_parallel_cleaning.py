@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from liss_data.parallel_cleaning import _select_jobs
+from liss_data.parallel_cleaning import is_outdated
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = {name: tmp_path / name for name in ["spec.csv", "raw.dta", "out.pickle"]}
+    for i, path in enumerate(paths.values()):
+        path.write_text(str(i))
+    os.utime(paths["spec.csv"], (1000, 1000))
+    os.utime(paths["raw.dta"], (2000, 2000))
+    os.utime(paths["out.pickle"], (3000, 3000))
+    return paths
+
+
+def test_is_outdated_if_product_is_up_to_date(files):
+    assert not is_outdated([files["spec.csv"], files["raw.dta"]], [files["out.pickle"]])
+
+
+def test_is_outdated_if_dependency_changed(files):
+    os.utime(files["spec.csv"], (4000, 4000))
+    assert is_outdated([files["spec.csv"], files["raw.dta"]], [files["out.pickle"]])
+
+
+def test_is_outdated_if_product_is_missing(files, tmp_path):
+    products = [files["out.pickle"], tmp_path / "out.csv"]
+    assert is_outdated([files["spec.csv"]], products)
+
+
+def test_is_outdated_compares_with_oldest_product(files, tmp_path):
+    new_product = tmp_path / "out.csv"
+    new_product.write_text("")
+    os.utime(new_product, (5000, 5000))
+    os.utime(files["spec.csv"], (4000, 4000))
+    assert is_outdated([files["spec.csv"]], [files["out.pickle"], new_product])
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    jobs = []
+    for name, size in [("big", 60), ("medium", 30), ("small", 10)]:
+        path = tmp_path / f"{name}.dta"
+        path.write_bytes(b"0" * size)
+        jobs.append((name, ["pickle"], [path]))
+    return jobs
+
+
+def test_select_jobs_respects_memory_limit(jobs):
+    # Estimated memory is three times the size of the raw files
+    selected = _select_jobs([0, 1, 2], {}, jobs, n_workers=3, memory_limit=230)
+    assert selected == [0, 2]
+
+
+def test_select_jobs_runs_too_large_job_alone(jobs):
+    assert _select_jobs([0, 1, 2], {}, jobs, n_workers=3, memory_limit=100) == [0]
+    assert _select_jobs([1, 2], {"future": 0}, jobs, 3, memory_limit=100) == []
+
+
+def test_select_jobs_respects_number_of_workers(jobs):
+    selected = _select_jobs([0, 1, 2], {}, jobs, n_workers=2, memory_limit=1000)
+    assert selected == [0, 1]
@@ -0,0 +1,170 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from corona_preparation import utils_corona_prep
+from corona_preparation.utils_corona_prep import create_weighting
+from corona_preparation.utils_corona_prep import post_stratification_weights
+from corona_preparation.utils_corona_prep import rake_weights
+
+AGE_BINS = [17, 30, 40, 50, 60, 70, 80, 90, 1000]
+GENDERS = ["Male", "Female"]
+CIVIL_STATUS = ["Never been married", "Married", "Widow or widower", "Divorced"]
+WEIGHTING_VARS = ["age", "gender", "civil_status"]
+
+
+@pytest.fixture
+def population_dist():
+    cells = list(
+        itertools.product(pd.IntervalIndex.from_breaks(AGE_BINS), GENDERS, CIVIL_STATUS)
+    )
+    shares = np.random.default_rng(0).random(len(cells))
+    index = pd.MultiIndex.from_tuples(cells, names=WEIGHTING_VARS)
+    return pd.Series(shares / shares.sum(), index=index)
+
+
+@pytest.fixture
+def raw_df():
+    rng = np.random.default_rng(1)
+    n_persons = 400
+    periods = [201912, 202003, 202004, 202005]
+    index = pd.MultiIndex.from_product(
+        [range(n_persons), periods], names=["personal_id", "period"]
+    )
+    n = len(index)
+    df = pd.DataFrame(
+        {
+            "age": np.repeat(rng.integers(15, 104, n_persons), len(periods)),
+            "gender": rng.choice(GENDERS, n),
+            "civil_status": rng.choice(CIVIL_STATUS + ["Separated"], n),
+            "other": rng.random(n),
+        },
+        index=index,
+    ).astype({"age": float})
+    # Missing demographics and persons not observed in all periods
+    df.loc[rng.random(n) < 0.1, "gender"] = np.nan
+    df.loc[rng.random(n) < 0.1, "age"] = np.nan
+    return df.drop(df.index[rng.random(n) < 0.2])
+
+
+def _create_weighting_period_by_period(raw_df, age_bins, population_dist):
+    """The former implementation of create_weighting."""
+    df = raw_df[WEIGHTING_VARS]
+    df = df.groupby("personal_id").bfill()
+    df = df.dropna().query("age >= 18").copy()
+    df.loc[df["age"] > 99, "age"] = 99
+    df["age"] = pd.cut(df["age"], age_bins)
+    df["civil_status"] = df["civil_status"].replace({"Separated": "Married"})
+
+    weights_by_period = {}
+    for period in df.index.unique("period"):
+        sample = df.xs(period, level="period")
+        sample_dist = sample.groupby(WEIGHTING_VARS).size() / len(sample)
+        weights = (population_dist / sample_dist.loc[sample_dist != 0]).dropna()
+        weights.name = "age_sex_marital_weighting"
+        weights_by_period[period] = weights
+
+    weights = pd.concat(weights_by_period)
+    out = df.join(weights, on=["period"] + WEIGHTING_VARS)
+    return raw_df.join(out["age_sex_marital_weighting"])
+
+
+def test_create_weighting_same_as_period_by_period(
+    raw_df, population_dist, monkeypatch
+):
+    monkeypatch.setattr(
+        utils_corona_prep,
+        "load_population_dist",
+        lambda weighting_vars: (AGE_BINS, population_dist),
+    )
+
+    expected = _create_weighting_period_by_period(raw_df, AGE_BINS, population_dist)
+    result = create_weighting(raw_df)
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def _sample(n=3000, seed=2):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "period": rng.choice([1, 2, 3], n),
+            "gender": rng.choice(GENDERS, n, p=[0.3, 0.7]),
+            "civil_status": rng.choice(CIVIL_STATUS, n, p=[0.1, 0.5, 0.1, 0.3]),
+        }
+    )
+
+
+MARGINS = {
+    "gender": pd.Series([0.5, 0.5], index=GENDERS),
+    "civil_status": pd.Series([0.3, 0.4, 0.1, 0.2], index=CIVIL_STATUS),
+}
+
+
+def _weighted_shares(df, weights, var):
+    return (
+        weights.groupby([df["period"], df[var]]).sum()
+        / weights.groupby(df["period"]).sum()
+    )
+
+
+def test_rake_weights_matches_margins():
+    df = _sample()
+
+    weights, diagnostics = rake_weights(df, MARGINS, by="period")
+
+    assert diagnostics["converged"]
+    assert (diagnostics["deviation_by_group"] < 1e-10).all()
+    for var, margin in MARGINS.items():
+        shares = _weighted_shares(df, weights, var).unstack()
+        expected = pd.DataFrame([margin] * 3, index=shares.index)[shares.columns]
+        pd.testing.assert_frame_equal(shares, expected, check_names=False)
+    group_size = df.groupby("period").size()
+    pd.testing.assert_series_equal(
+        weights.groupby(df["period"]).sum(), group_size.astype(float)
+    )
+
+
+def test_rake_weights_one_variable_is_post_stratification():
+    df = _sample()
+    margin = MARGINS["civil_status"]
+    population_dist = margin.rename_axis("civil_status")
+
+    weights, _ = rake_weights(df, {"civil_status": margin}, by="period")
+    expected = post_stratification_weights(df, population_dist, by="period")
+
+    np.testing.assert_allclose(weights, expected, rtol=1e-12)
+
+
+def test_rake_weights_rescales_margins_to_observed_categories():
+    df = _sample()
+    # No widows in period 2
+    df = df[~((df["period"] == 2) & (df["civil_status"] == "Widow or widower"))]
+
+    weights, diagnostics = rake_weights(df, MARGINS, by="period")
+
+    assert diagnostics["converged"]
+    shares = _weighted_shares(df, weights, "civil_status").loc[2]
+    observed = MARGINS["civil_status"].drop("Widow or widower")
+    pd.testing.assert_series_equal(
+        shares.sort_index(), (observed / observed.sum()).sort_index(), check_names=False
+    )
+    np.testing.assert_allclose(
+        weights.groupby(df["period"]).sum(), df.groupby("period").size()
+    )
+
+
+def test_rake_weights_reports_non_convergence():
+    df = _sample()
+
+    with pytest.warns(UserWarning, match="did not converge"):
+        weights, diagnostics = rake_weights(df, MARGINS, by="period", max_iter=1)
+
+    assert not diagnostics["converged"]
+    assert diagnostics["n_iter"] == 1
+    assert set(diagnostics["deviation_by_group"].index) == {1, 2, 3}
+    assert diagnostics["max_deviation"] == diagnostics["deviation_by_group"].max()
+    np.testing.assert_allclose(
+        weights.groupby(df["period"]).sum(), df.groupby("period").size()
+    )
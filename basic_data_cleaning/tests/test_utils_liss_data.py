@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from liss_data import utils_liss_data
+from liss_data.utils_liss_data import load_spec_yaml
+from liss_data.utils_liss_data import merge_double_columns
+from liss_data.utils_liss_data import update_double_columns
+
+
+@pytest.fixture
+def spec_cache(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(utils_liss_data, "OUT_SPECS_CACHE", cache)
+    return cache
+
+
+@pytest.fixture
+def spec_file(tmp_path):
+    path = tmp_path / "specs.yaml"
+    path.write_text("a: 1\n")
+    return path
+
+
+def test_load_spec_yaml_is_cached(spec_cache, spec_file, monkeypatch):
+    assert load_spec_yaml(spec_file) == {"a": 1}
+    assert len(list(spec_cache.glob("specs-yaml-*.pickle"))) == 1
+
+    # The file is not parsed again as long as it is unchanged
+    monkeypatch.setattr(utils_liss_data, "_parse_yaml", lambda path: "parsed again")
+    assert load_spec_yaml(spec_file) == {"a": 1}
+
+
+def test_load_spec_yaml_replaces_entry_of_changed_file(spec_cache, spec_file):
+    load_spec_yaml(spec_file)
+    spec_file.write_text("a: 2\n")
+
+    assert load_spec_yaml(spec_file) == {"a": 2}
+    assert len(list(spec_cache.glob("specs-yaml-*.pickle"))) == 1
+
+
+def test_load_spec_yaml_parses_again_if_code_changed(
+    spec_cache, spec_file, monkeypatch
+):
+    load_spec_yaml(spec_file)
+    (old_cache_path,) = spec_cache.glob("specs-yaml-*.pickle")
+
+    monkeypatch.setattr(utils_liss_data, "_parsing_code_hash", lambda: "changed")
+    monkeypatch.setattr(utils_liss_data, "_parse_yaml", lambda path: "parsed again")
+
+    assert load_spec_yaml(spec_file) == "parsed again"
+    assert not old_cache_path.exists()
+    assert len(list(spec_cache.glob("specs-yaml-*.pickle"))) == 1
+
+
+def _combine_row_by_row(df, suffix, prefer_suffixed):
+    """The former merge_double_columns and update_double_columns."""
+
+    def first_non_missing(x, y):
+        for value in (x, y):
+            if type(value) == str or not math.isnan(value):
+                return value
+        return np.nan
+
+    suffixed_cols = [x for x in df.columns if x[-len(suffix) :] == suffix]
+    for col in suffixed_cols:
+        base = col[: -len(suffix)]
+        if prefer_suffixed:
+            df[base] = df.apply(lambda x: first_non_missing(x[col], x[base]), axis=1)
+        else:
+            df[base] = df.apply(lambda x: first_non_missing(x[base], x[col]), axis=1)
+    return df.drop(columns=suffixed_cols)
+
+
+@pytest.fixture
+def double_columns():
+    """Column pairs with missing values in either, both or none of the columns."""
+    first = [1.0, np.nan, 3.0, np.nan, 5.0, np.nan]
+    second = [10.0, 20.0, np.nan, np.nan, 50.0, 60.0]
+    text_first = ["a", np.nan, "c", np.nan, "e", np.nan]
+    text_second = ["x", "y", np.nan, np.nan, "z", "b"]
+    return pd.DataFrame(
+        {
+            "float": first,
+            "float_suffix": second,
+            "object": text_first,
+            "object_suffix": text_second,
+            "category": pd.Categorical(text_first),
+            "category_suffix": pd.Categorical(text_second),
+            "mixed": pd.Categorical(text_first),
+            "mixed_suffix": text_second,
+            "other": range(6),
+        },
+        index=pd.Index([3, 1, 4, 1, 5, 9], name="personal_id"),
+    )
+
+
+@pytest.mark.parametrize(
+    "func, suffix, prefer_suffixed",
+    [(merge_double_columns, "_merge", False), (update_double_columns, "_update", True)],
+)
+def test_combine_double_columns_equals_row_by_row(
+    double_columns, func, suffix, prefer_suffixed
+):
+    df = double_columns.rename(columns=lambda c: c.replace("_suffix", suffix))
+    expected = _combine_row_by_row(df.copy(), suffix, prefer_suffixed)
+    result = func(df.copy())
+
+    assert list(result.columns) == list(expected.columns)
+    assert result["float"].dtype == float
+    for col in ["category", "mixed"]:
+        assert result[col].dtype.name == "category"
+        assert set(result[col].cat.categories) == {"a", "b", "c", "e", "x", "y", "z"}
+    # Row-wise apply returned the values of categoricals as objects
+    pd.testing.assert_frame_equal(
+        result.astype(object), expected.astype(object), check_dtype=False
+    )
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from liss_data.utils_liss_data import write_csv
+
+
+def _cleaned(df, sep=";", replacement=","):
+    df = df.copy()
+    for c in df:
+        if df[c].dtype == object:
+            df[c] = (
+                df[c]
+                .replace("[\n\r]", " ", regex=True)
+                .replace(sep, replacement, regex=True)
+            )
+    return df
+
+
+@pytest.fixture
+def panel():
+    n = 5000
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_arrays(
+        [np.arange(n), pd.to_datetime(rng.choice(["2020-03-01", "2020-04-01"], n))],
+        names=["personal_id", "month"],
+    )
+    df = pd.DataFrame(rng.random((n, 45)), index=index).add_prefix("x")
+    # Only one value is not at midnight. It is not in the first block of rows.
+    dates = pd.Series(pd.Timestamp("2020-01-01"), index=index)
+    dates.iloc[3000] = pd.Timestamp("2020-01-01 12:30")
+    df["date"] = dates
+    df["date_tz"] = dates.dt.tz_localize("Europe/Amsterdam")
+    df["text"] = np.where(np.arange(n) % 3 == 0, "free; text\nwith €", None)
+    df["category"] = pd.Categorical(rng.choice(["a", "b"], n))
+    df["int"] = pd.array(rng.integers(0, 5, n), dtype="Int64")
+    return df
+
+
+@pytest.mark.parametrize("chunksize", [1, 1500, 4000, 10000])
+def test_write_csv_same_as_to_csv_across_chunks(panel, tmp_path, chunksize):
+    panel.to_csv(tmp_path / "expected.csv", sep=";")
+    write_csv(panel, tmp_path / "result.csv", chunksize=chunksize, clean_strings=False)
+
+    expected = (tmp_path / "expected.csv").read_bytes()
+    assert (tmp_path / "result.csv").read_bytes() == expected
+
+
+def test_write_csv_same_as_to_csv_for_few_columns(tmp_path):
+    dates = pd.Series(pd.Timestamp("2020-01-01"), index=range(20000))
+    dates.iloc[15000] = pd.Timestamp("2020-01-01 08:00")
+    df = pd.DataFrame({"date": dates, "value": np.arange(20000)})
+
+    df.to_csv(tmp_path / "expected.csv", sep=";")
+    write_csv(df, tmp_path / "result.csv", clean_strings=False)
+
+    expected = (tmp_path / "expected.csv").read_bytes()
+    assert (tmp_path / "result.csv").read_bytes() == expected
+
+
+@pytest.mark.parametrize("sep, replacement", [(";", ","), ("\t", " ")])
+def test_write_csv_cleans_strings(panel, tmp_path, sep, replacement):
+    _cleaned(panel, sep, replacement).to_csv(tmp_path / "expected.csv", sep=sep)
+    write_csv(panel, tmp_path / "result.csv", sep=sep, chunksize=1000)
+
+    expected = (tmp_path / "expected.csv").read_bytes()
+    assert (tmp_path / "result.csv").read_bytes() == expected
+
+
+def test_write_csv_writes_utf8(panel, tmp_path):
+    write_csv(panel, tmp_path / "result.csv")
+
+    content = (tmp_path / "result.csv").read_bytes().decode("utf-8")
+    assert "free, text with €" in content
+
+
+def test_write_csv_empty_data_frame(tmp_path):
+    df = pd.DataFrame(columns=["a", "b"])
+    df.to_csv(tmp_path / "expected.csv", sep=";")
+    write_csv(df, tmp_path / "result.csv")
+
+    expected = (tmp_path / "expected.csv").read_bytes()
+    assert (tmp_path / "result.csv").read_bytes() == expected
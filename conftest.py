@@ -0,0 +1,10 @@
+"""Make the packages in basic_data_cleaning importable in the tests.
+
+The tasks in basic_data_cleaning are run from within that directory and import
+its packages directly, e.g. ``from liss_data.utils_liss_data import ...``.
+
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "basic_data_cleaning"))
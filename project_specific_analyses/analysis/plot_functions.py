@@ -45,24 +45,122 @@ def _weight_cols(data, cols, weight_col, other_cols, by=[]):
         out = d[cols].multiply(d[weight_col], axis="index")
         out[by + [weight_col]] = d[by + [weight_col]]
 
-        # Iterate over unique values of by variables and normalize in each group
-        chunks_by_by = []
-        for row in out.reset_index()[by].drop_duplicates().dropna().iterrows():
-            temp = out.copy()
+        # Normalize the mean weight to one within each group
+        grouped = d.groupby(by, observed=True, sort=False)[weight_col]
+        norm = grouped.transform("sum") / grouped.transform("size")
+        out[cols] = out[cols].divide(norm, axis="index")
 
-            # Select a chunk
-            for by_var in by:
-                temp = temp.loc[temp[by_var] == row[1][by_var]]
+    out[other_cols] = d[other_cols]
+    return out[cols + other_cols + by].sort_index()
 
-            # Normalize
-            norm = temp[weight_col].sum() / len(temp[weight_col])
-            temp[cols] = temp[cols] / norm
-            chunks_by_by.append(temp)
 
-        out = pd.concat(chunks_by_by)
+def grouped_means_and_stds(data, cols, by_specs, weight_col=None, dropna=True):
+    """Calculate (weighted) means, standard deviations and counts by groups.
 
-    out[other_cols] = d[other_cols]
-    return out[cols + other_cols + by].sort_index()
+    The data is passed only once: counts, sums of weights, weighted sums and
+    sums of squares of *cols* are computed for the cells defined by all
+    variables in *by_specs* and then added up for each grouping. As in
+    _weight_cols, the weights are normalized to a mean of one in each group.
+
+    Args:
+        data (pd.DataFrame): data containing *cols*, *weight_col* and the by
+            variables
+        cols (list): columns to calculate statistics of
+        by_specs (list): list of lists of columns for grouping
+        weight_col (str): column which contains the weights, unweighted if None
+        dropna (boolean): if observations with a missing value in one of *cols*
+            or *weight_col* should be dropped for all columns
+
+    Returns:
+        dict: maps the tuple of by variables to a tuple of DataFrames with the
+            means, standard deviations and counts of *cols* in each group
+
+    """
+    if dropna:
+        subset = cols if weight_col is None else cols + [weight_col]
+        data = data.dropna(subset=subset)
+    if weight_col is None:
+        weights = pd.Series(1.0, index=data.index)
+    else:
+        weights = data[weight_col].astype(float)
+
+    values = data[cols].astype(float)
+    observed = values.notna()
+    weighted = values.multiply(weights, axis="index")
+    stats = pd.concat(
+        {
+            "count": observed.astype(float),
+            "weight": observed.multiply(weights, axis="index"),
+            "sum": weighted,
+            "sum_sq": weighted**2,
+        },
+        axis=1,
+    )
+
+    # Add up the statistics in the cells of all by variables, missing values of
+    # the by variables are kept as code -1
+    by_vars = list(dict.fromkeys(var for by in by_specs for var in by))
+    codes = {var: _group_codes(data[var]) for var in by_vars}
+    cells = stats.groupby(
+        [pd.Series(codes[var][0], index=data.index, name=var) for var in by_vars],
+        sort=False,
+    ).sum()
+
+    out = {}
+    for by in by_specs:
+        sums = cells.groupby(level=by).sum()
+        sums = sums.loc[(sums.index.to_frame() >= 0).all(axis=1).to_numpy()]
+        sums.index, full_index = _decode_group_index(sums.index, by, codes)
+        if full_index is not None:
+            sums = sums.reindex(full_index, fill_value=0)
+
+        count = sums["count"]
+        mean = sums["sum"] / sums["weight"]
+        norm = sums["weight"] / count
+        var = (sums["sum_sq"] / norm**2 - count * mean**2) / (count - 1)
+        std = np.sqrt(var.clip(lower=0).where(count > 1))
+        out[tuple(by)] = (mean, std, count.astype(int))
+
+    return out
+
+
+def _group_codes(sr):
+    """Return integer codes of *sr* in sort order and the values they map to."""
+    if sr.dtype.name == "category":
+        return sr.cat.codes.to_numpy(), sr.dtype
+    return pd.factorize(sr, sort=True)
+
+
+def _decode_group_index(index, by, codes):
+    """Replace the codes in *index* by the values of the by variables.
+
+    If one of the by variables is categorical, the index with all combinations
+    of categories and values is returned as second element, as groupby does
+    with categorical keys. Otherwise the second element is None.
+
+    """
+    levels = []
+    full_levels = []
+    for var in by:
+        var_codes = index.get_level_values(var).to_numpy()
+        uniques = codes[var][1]
+        if isinstance(uniques, pd.CategoricalDtype):
+            levels.append(pd.Categorical.from_codes(var_codes, dtype=uniques))
+            full_levels.append(pd.CategoricalIndex(uniques.categories, dtype=uniques))
+        else:
+            levels.append(uniques.take(var_codes))
+            full_levels.append(uniques.take(np.unique(var_codes)))
+
+    if len(by) == 1:
+        decoded = pd.Index(levels[0], name=by[0])
+        full = full_levels[0].rename(by[0])
+    else:
+        decoded = pd.MultiIndex.from_arrays(levels, names=by)
+        full = pd.MultiIndex.from_product(full_levels, names=by)
+
+    if any(isinstance(codes[var][1], pd.CategoricalDtype) for var in by):
+        return decoded, full
+    return decoded, None
 
 
 def weighted_means_by(cols, data, weight_col, dropna=True, by=None):
@@ -97,18 +195,18 @@ def weighted_means_by(cols, data, weight_col, dropna=True, by=None):
         out = pd.concat([means, sd], axis=0)
 
     else:
-        if not dropna:
-            if weight_col == "ones":
-                d = data[cols + by]
-            else:
-                ValueError("weighting requires dropna=True")
-        else:
-            d = _weight_cols(
-                data=data, cols=cols, weight_col=weight_col, other_cols=[], by=by
-            )
-        means = d.groupby(by).mean()
-        sd = d.groupby(by).std() / np.sqrt(d.groupby(by).count() - 1)
-        means["N"] = d.groupby(by).count().iloc[:, 0]
+        if not dropna and weight_col != "ones":
+            raise ValueError("weighting requires dropna=True")
+        mean, std, count = grouped_means_and_stds(
+            data=data,
+            cols=cols,
+            by_specs=[by],
+            weight_col=weight_col if dropna else None,
+            dropna=dropna,
+        )[tuple(by)]
+        means = mean.copy()
+        sd = std / np.sqrt(count - 1)
+        means["N"] = count[cols[0]]
 
         colnames = ["se_" + c for c in cols]
         sd.columns = colnames
@@ -9,12 +9,12 @@ from statsmodels.iolib.summary2 import _make_unique
 from statsmodels.iolib.summary2 import Summary
 
 from project_specific_analyses.analysis.plot_functions import _weight_cols
+from project_specific_analyses.analysis.plot_functions import grouped_means_and_stds
 
 
 def calc_means_and_se(df, by, cols):
-    mean = df.groupby(by)[cols].mean()
-    std = df.groupby(by)[cols].std()
-    count = df.groupby(by)[cols].count()
+    by = [by] if isinstance(by, str) else list(by)
+    mean, std, count = grouped_means_and_stds(df, cols, [by], dropna=False)[tuple(by)]
     se = std / np.sqrt(count - 1)
     if "month" in mean.index.names:
         mean.index = mean.index.set_levels(
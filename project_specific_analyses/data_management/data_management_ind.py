@@ -14,6 +14,12 @@ import numpy as np
 import pandas as pd
 
 from output.project_paths import project_paths_join as ppj
+from project_specific_analyses.data_management.data_management_utils import (
+    make_vars_time_invariant,
+)
+from project_specific_analyses.data_management.data_management_utils import (
+    normalize_dtypes_for_parquet,
+)
 from project_specific_analyses.data_management.data_management_utils import (
     set_types_file,
 )
@@ -31,15 +37,40 @@ from project_specific_analyses.data_management.variables_to_keep import (
 from project_specific_analyses.data_management.variables_to_keep import (
     timevarying_variables,
 )
+from project_specific_analyses.library.panel_functions import (
+    broadcast_person_values,
+)
 from project_specific_analyses.library.panel_functions import get_baseline
+from project_specific_analyses.library.panel_functions import get_baselines
+from project_specific_analyses.library.panel_functions import month_to_columns
 
 
 def generate_baseline_variables(covid):
     """Generate variables that calculate the difference to baseline."""
     covid = covid.copy()
     covid = covid.sort_index()
-    covid = get_baseline(covid, "out_of_laborf_baseline", "out_of_laborf")
-    covid = get_baseline(covid, "not_working_baseline", "not_working")
+
+    # Baseline values of all variables at once, hours_tu from the 2019 time use
+    # survey
+    baselines = {
+        "out_of_laborf_baseline": "out_of_laborf",
+        "not_working_baseline": "not_working",
+        "home_share_baseline": "home_share",
+    }
+    for uncond in ["", "_uncond"]:
+        baselines[f"hours_home{uncond}_baseline"] = f"hours_home{uncond}"
+        for hours in ["hours", "hours_tu"]:
+            baselines[f"{hours}{uncond}_baseline"] = f"{hours}_total{uncond}"
+    covid = get_baselines(
+        covid,
+        list(baselines.values()),
+        baseline=[
+            "2019-11-01" if name.startswith("hours_tu") else "2020-02-01"
+            for name in baselines
+        ],
+        names=list(baselines),
+    )
+
     covid["change_out_of_laborf"] = (
         covid["out_of_laborf"] - covid["out_of_laborf_baseline"]
     )
@@ -49,9 +80,6 @@ def generate_baseline_variables(covid):
     for uncond in ["", "_uncond"]:
 
         # Hours home
-        covid = get_baseline(
-            covid, f"hours_home{uncond}_baseline", f"hours_home{uncond}"
-        )
         covid[f"abs_change_hours_home{uncond}"] = (
             covid[f"hours_home{uncond}"] - covid[f"hours_home{uncond}_baseline"]
         )
@@ -62,13 +90,6 @@ def generate_baseline_variables(covid):
         # Hours total
         for hours in ["hours", "hours_tu"]:
 
-            covid = get_baseline(
-                covid,
-                f"{hours}{uncond}_baseline",
-                f"{hours}_total{uncond}",
-                baseline="2020-02-01" if hours == "hours" else "2019-11-01",
-            )
-
             covid[f"abs_change_{hours}{uncond}"] = (
                 covid[f"hours_total{uncond}"] - covid[f"{hours}{uncond}_baseline"]
             )
@@ -88,9 +109,6 @@ def generate_baseline_variables(covid):
                 covid.loc[covid[rel] < q02, rel + "_winsorize"] = q02
                 covid.loc[covid[rel] > q98, rel + "_winsorize"] = q98
 
-    # Home share
-    covid = get_baseline(covid, "home_share_baseline", "home_share")
-
     return covid
 
 
@@ -268,9 +286,7 @@ def generate_new_variables(covid):
                 f"{abs_rel}_change_hours_uncond_04",
             ]
         ].mean(axis=1)
-        covid = covid.reset_index().set_index("personal_id")
-        covid = covid.join(temp)
-        covid = covid.reset_index().set_index(["personal_id", "month"])
+        covid[temp.columns] = broadcast_person_values(temp, covid.index)
 
     # expectations and concerns
     covid["concern_4w_job"] = covid["concern_4w_unemp"].fillna(
@@ -279,35 +295,36 @@ def generate_new_variables(covid):
     covid["p_2m_lost"] = covid["p_2m_employee_lost"].fillna(
         covid["p_3m_selfempl_shutdown"]
     )
-    for c in [
-        "p_2m_employee_keep",
-        "p_2m_employee_keep_gov",
-        "p_2m_employee_lost",
-        "p_2m_employee_other",
-        "p_2m_employee_unemployed",
-        "p_2m_employee_new_job",
-        "p_2m_lost",
-        "p_3m_selfempl_shutdown",
-        "concern_4w_job",
-    ]:
-        covid = get_baseline(covid, c + "_baseline", c, baseline="2020-03-01")
+    covid = get_baselines(
+        covid,
+        [
+            "p_2m_employee_keep",
+            "p_2m_employee_keep_gov",
+            "p_2m_employee_lost",
+            "p_2m_employee_other",
+            "p_2m_employee_unemployed",
+            "p_2m_employee_new_job",
+            "p_2m_lost",
+            "p_3m_selfempl_shutdown",
+            "concern_4w_job",
+        ],
+        baseline="2020-03-01",
+    )
 
     # Create variables that fill subject that became unemployed until may with 0 or 1
-    covid = covid.reset_index()
     for value in [0, 1]:
         covid[f"applied_any_policy_05_fill{value}"] = covid["applied_any_policy_05"]
         covid.loc[
-            (covid["month"] == "2020-05-01")
+            (covid.index.get_level_values("month") == "2020-05-01")
             & (covid["not_working"] == 1)
             & (covid["not_working_baseline"] == 0),
             f"applied_any_policy_05_fill{value}",
         ] = value
         covid[f"applied_any_policy_05_fill{value}"] = (
-            covid.groupby("personal_id")[f"applied_any_policy_05_fill{value}"]
+            covid.groupby(level="personal_id")[f"applied_any_policy_05_fill{value}"]
             .bfill()
             .ffill()
         )
-    covid = covid.set_index(["personal_id", "month"])
 
     # Make groups variables
     var = "net_income"
@@ -590,8 +607,7 @@ def clean_covid_data(covid):
 
     # Fill work status for periods where work status isn't asked. Generate some associate vars
     covid = fill_work_status(covid)
-    for var in ["work_status", "unemployed", "self_employed"]:
-        covid = get_baseline(covid, f"{var}_baseline", var)
+    covid = get_baselines(covid, ["work_status", "unemployed", "self_employed"])
 
     # Fix work status
     covid["work_status_baseline"] = covid["work_status_baseline"].astype(object)
@@ -609,19 +625,14 @@ def clean_covid_data(covid):
     covid["work_status"] = pd.Categorical(covid["work_status"])
 
     # Make time-invariant variable if person unemployed any time after May
-    covid = covid.reset_index().set_index("personal_id")
-    covid["unemployed_after_may"] = (
-        covid.query("month >= '2020-05-01'").groupby("personal_id")["unemployed"].max()
-    )
-    covid["out_of_laborf_after_may"] = (
+    after_may = (
         covid.query("month >= '2020-05-01'")
-        .groupby("personal_id")["out_of_laborf"]
+        .groupby("personal_id")[["unemployed", "out_of_laborf", "not_working"]]
         .max()
     )
-    covid["not_working_after_may"] = (
-        covid.query("month >= '2020-05-01'").groupby("personal_id")["not_working"].max()
-    )
-    covid = covid.reset_index().set_index(["personal_id", "month"])
+    covid[
+        ["unemployed_after_may", "out_of_laborf_after_may", "not_working_after_may"]
+    ] = broadcast_person_values(after_may, covid.index)
 
     # Generate indicator if present in all waves
     max_waves = covid.groupby("personal_id")["age"].count().max()
@@ -656,15 +667,16 @@ def clean_covid_data(covid):
 
     # work_perc_home
     covid["work_perc_home_raw"] = covid["work_perc_home"]
-    covid = covid.reset_index().set_index("personal_id")
-    covid["work_perc_home"] = covid["work_perc_home"].groupby("personal_id").mean()
-    covid = covid.reset_index().set_index(["personal_id", "month"])
+    covid["work_perc_home"] = broadcast_person_values(
+        covid["work_perc_home"].groupby("personal_id").mean(), covid.index
+    )
 
     # Generate total hours variable for time use measure
     covid["hours_tu_total"] = covid["hours_work_total"]
     covid["hours_tu_total_uncond"] = covid["hours_tu_total"]
 
     # Create unconditional hours variable
+    time_invariant_hours = []
     for var in [
         "hours_home",
         "hours_workplace",
@@ -715,8 +727,8 @@ def clean_covid_data(covid):
                 ],
                 f"{var}_uncond",
             ] = np.nan
-            covid = make_vars_time_invariant(covid, [var])
-            covid = make_vars_time_invariant(covid, [f"{var}_uncond"])
+            time_invariant_hours += [var, f"{var}_uncond"]
+    covid = make_vars_time_invariant(covid, time_invariant_hours)
 
     # Generate max hours worked
     covid["max_hours_total"] = (
@@ -830,16 +842,16 @@ def clean_covid_data(covid):
             covid.loc[covid[val] == 1, col_name] = 1
 
         # Make baseline variable by taking the maximum
-        covid = covid.reset_index().set_index("personal_id")
-        covid[f"{col_name}_baseline"] = covid.groupby("personal_id")[col_name].max()
-        covid = covid.reset_index().set_index(["personal_id", "month"])
+        covid[f"{col_name}_baseline"] = broadcast_person_values(
+            covid.groupby("personal_id")[col_name].max(), covid.index
+        )
 
         # Get march april seperately
-        covid = get_baseline(
-            covid, f"{col_name}_march", col_name, baseline="2020-03-01"
-        )
-        covid = get_baseline(
-            covid, f"{col_name}_april", col_name, baseline="2020-04-01"
+        covid = get_baselines(
+            covid,
+            [col_name, col_name],
+            baseline=["2020-03-01", "2020-04-01"],
+            names=[f"{col_name}_march", f"{col_name}_april"],
         )
 
     # Time varying care variable
@@ -1162,12 +1174,10 @@ def clean_covid_data(covid):
         "applied_any_policy_cat",
         "applied_any_policy_narrow",
     ]:
-        temp = covid[var].unstack()
-        covid = covid.reset_index().set_index(["personal_id"])
         obs_months = ["05", "09"]
-        for month in obs_months:
-            covid[f"{var}_{month}"] = temp[pd.to_datetime(f"2020-{month}-01")]
-        covid = covid.reset_index().set_index(["personal_id", "month"])
+        covid[[f"{var}_{month}" for month in obs_months]] = month_to_columns(
+            covid, var, [f"2020-{month}-01" for month in obs_months]
+        )
 
         if not "cat" in var:
             covid[f"{var}_any"] = (
@@ -1281,29 +1291,6 @@ def fill_work_status(covid):
     return covid
 
 
-def make_vars_time_invariant(df, cols):
-    df = df.reset_index().set_index("personal_id")
-
-    for col in cols:
-        time_invariant = df[col].copy()
-        time_invariant = time_invariant.dropna()
-
-        # Check for duplicates
-        double = time_invariant.index.duplicated()
-        if double.any():
-            warnings.warn(f"Duplicates in {col}, only one will be kept.")
-            # {time_invariant.loc[time_invariant.index.duplicated()]}s
-
-            time_invariant = time_invariant[~double]
-
-        # Join column in
-        df = df.drop(columns=col).join(time_invariant)
-
-    df = df.reset_index().set_index(["personal_id", "month"])
-
-    return df
-
-
 def create_hh_income_data(hh_income, covid):
 
     hh_income = hh_income.reset_index().set_index(["personal_id", "month"]).copy()
@@ -1372,14 +1359,14 @@ def create_hh_income_data(hh_income, covid):
             .groupby("personal_id")
             .mean()
         )
-        hh_income = hh_income.reset_index().set_index(["personal_id"])
-        hh_income[f"{var}_baseline"] = temp
+        hh_income[f"{var}_baseline"] = broadcast_person_values(temp, hh_income.index)
         hh_income[f"change_{var}"] = hh_income[var] - hh_income[f"{var}_baseline"]
         hh_income.loc[hh_income[f"{var}_baseline"] > 0, f"rel_change_{var}"] = (
             hh_income.loc[hh_income[f"{var}_baseline"] > 0, f"change_{var}"]
             / hh_income.loc[hh_income[f"{var}_baseline"] > 0, f"{var}_baseline"]
         )
 
+    hh_income = hh_income.reset_index(level="month")
     hh_income.to_parquet(ppj("OUT_DATA", "hh_income.parquet"))
 
 
@@ -1468,23 +1455,5 @@ if __name__ == "__main__":
     create_hh_income_data(hh_income, covid)
 
     # Export long format
-    try:
-        covid.to_parquet(ppj("OUT_DATA", "work-childcare-ind.parquet"))
-    except:
-        colus = list(covid.columns)
-        colus.remove("hours_workplace")
-        for col in colus:
-            try:
-                covid[["hours_workplace", col]].to_parquet("test.parquet")
-            except:
-                if covid[col].dtype.name == "category":
-                    covid[col].cat.categories = [
-                        str(c) for c in covid[col].cat.categories
-                    ]
-                else:
-                    print(
-                        f"!! {col} has dtype {covid[col].dtype} incompatible with parquet and is set to categorical"
-                    )
-                    covid[col] = covid[col].astype(str).astype("category")
-
-        covid.to_parquet(path=ppj("OUT_DATA", "work-childcare-ind.parquet"))
+    covid = normalize_dtypes_for_parquet(covid)
+    covid.to_parquet(ppj("OUT_DATA", "work-childcare-ind.parquet"))
@@ -2,6 +2,11 @@
 """
 import warnings
 
+import pandas as pd
+
+# inferred types of values that pyarrow cannot store in one column
+MIXED_TYPES = ["mixed", "mixed-integer"]
+
 
 def set_types_file(
     panel, rename_df, cat_sep=", ", int_to_float=True, bool_to_float=True
@@ -95,3 +100,76 @@ def set_types_file(
             )
 
     return out
+
+
+def normalize_dtypes_for_parquet(df):
+    """Coerce columns whose values cannot be written to parquet.
+
+    All columns are inspected in one pass. Object columns that mix strings
+    with other types are converted to string categoricals and categoricals
+    with mixed-type categories get string categories. Every change is
+    reported.
+
+    Args:
+        df (pandas.DataFrame): The dataframe to be exported.
+
+    Returns:
+        pandas.DataFrame: The dataframe with parquet compatible dtypes.
+
+    """
+    out = df.copy(deep=False)
+    for col in out.columns:
+        dtype = out[col].dtype
+        if dtype.name == "category":
+            categories = out[col].cat.categories
+            if pd.api.types.infer_dtype(categories) in MIXED_TYPES:
+                out[col] = out[col].cat.rename_categories([str(c) for c in categories])
+                print(f"!! categories of {col} are converted to strings for parquet")
+        elif dtype == object:
+            if pd.api.types.infer_dtype(out[col], skipna=True) in MIXED_TYPES:
+                print(
+                    f"!! {col} has dtype {dtype} incompatible with parquet and is set "
+                    "to categorical"
+                )
+                out[col] = out[col].astype(str).astype("category")
+    return out
+
+
+def make_vars_time_invariant(df, cols):
+    """Set the columns *cols* to the first non-missing value of each individual.
+
+    All columns are computed in one groupby and broadcast back to the
+    (personal_id, month) index at once. The columns are moved to the end of the
+    data set, which is sorted by personal_id. Columns that have more than one
+    non-missing value for an individual are reported in one warning.
+
+    Args:
+        df (pandas.DataFrame or pandas.Series): data with index levels
+            personal_id and month.
+        cols (list): columns to be made time invariant.
+
+    Returns:
+        pandas.DataFrame: *df* with time invariant *cols*.
+
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    cols = list(cols)
+    df = df.reset_index().set_index(["personal_id", "month"])
+
+    # Sort by personal_id keeping the order of the observations of an individual
+    order = df.index.get_level_values("personal_id").argsort(kind="stable")
+    df = df.iloc[order]
+    personal_id = df.index.get_level_values("personal_id")
+    grouped = df[cols].groupby(personal_id, sort=False)
+
+    # Check for duplicates
+    n_values = df[cols].notna().groupby(personal_id, sort=False).sum()
+    double = n_values.columns[(n_values > 1).any()]
+    if len(double) > 0:
+        warnings.warn(f"Duplicates in {list(double)}, only one will be kept.")
+
+    time_invariant = grouped.first().reindex(personal_id)
+    time_invariant.index = df.index
+
+    return pd.concat([df.drop(columns=cols), time_invariant], axis=1)
@@ -7,12 +7,17 @@ Output:
 Contains all additionally necessary variables, and partners' variables.
 If you want to add additional variables, please do so in variables_to_keep.py
 """
-import warnings
 
 import numpy as np
 import pandas as pd
 
 from output.project_paths import project_paths_join as ppj
+from project_specific_analyses.data_management.data_management_utils import (
+    make_vars_time_invariant,
+)
+from project_specific_analyses.data_management.data_management_utils import (
+    normalize_dtypes_for_parquet,
+)
 from project_specific_analyses.data_management.variables_to_keep import (
     background_variables,
 )
@@ -22,6 +27,7 @@ from project_specific_analyses.data_management.variables_to_keep import (
 from project_specific_analyses.data_management.variables_to_keep import (
     timevarying_variables,
 )
+from project_specific_analyses.library.panel_functions import baseline_values
 from project_specific_analyses.library.panel_functions import get_baseline
 
 
@@ -42,25 +48,6 @@ def generate_hh_level_data(
         pd.DataFrame: df + columns with partner info named as columnname_partner.
 
     """
-    # Get partners personal id in the data set
-    partner_id = partner[["personal_id_partner"]].copy()
-    df_reindex = df.reset_index()
-    df_w_partner_id = pd.merge(df_reindex, partner_id, on="personal_id", how="left")
-
-    # Generate data set to merge in.
-    df_partner = df_w_partner_id.copy()
-
-    # Rename variables to have _partner in variable name
-    ren = {}
-    for col in df_partner.columns:
-        if not col in [time]:
-            ren.update({col: col + "_partner"})
-    df_partner.rename(columns=ren, inplace=True)
-    df_partner.rename(
-        columns={"personal_id_partner_partner": "personal_id"}, inplace=True
-    )
-    df_partner = df_partner.dropna(subset=["personal_id"])
-
     # Create lists with timevarying background/ time constant variables
     baselinevars = [var for var in df.columns if var.endswith("baseline")] + [
         "labor_force",
@@ -71,32 +58,15 @@ def generate_hh_level_data(
     time_back = [
         c + "_partner" for c in timevarying_background + ["work_status_baseline"]
     ]
-    time_constant = [c + "_partner" for c in timeconstant + baselinevars]
 
-    # Merge in all columns that are truly time dependent
-    df_hh = pd.merge(
-        df_w_partner_id,
-        df_partner.drop(time_constant, axis=1),
-        on=["personal_id", "personal_id_partner", time],
-        how="outer",
+    df_hh = merge_partner_columns(
+        df,
+        partner["personal_id_partner"],
+        time_constant=timeconstant + baselinevars,
+        time=time,
     )
 
-    # Merge in time constant variables
-    df_constant = df_partner[time_constant + ["personal_id_partner"]].copy()
-    df_constant = df_constant[~df_constant.personal_id_partner.duplicated()]
-    df_hh = pd.merge(
-        df_hh,
-        df_constant,
-        how="left",
-        on=["personal_id_partner"],
-        validate="many_to_one",
-    )
-
-    df_hh.set_index(["personal_id", time], inplace=True)
-    df_hh.sort_index(inplace=True)
-
-    ind = list(df_hh.index)
-    assert len(ind) == len(list(set(ind))), "Multiindex is not unique"
+    assert df_hh.index.is_unique, "Multiindex is not unique"
 
     # Not sure what we needed this for
     # Fill wholes in those columns that are partially time variant
@@ -120,22 +90,12 @@ def generate_hh_level_data(
             "labor_force_coarse",
         ]
     )
-    base = df_hh.index.get_level_values(time) == "2020-02-01"
-    var = (
-        df_hh.loc[base, baselinevars]
-        .reset_index()
-        .drop("month", axis=1)
-        .set_index("personal_id")
-        .copy()
-    )
     condition = df_hh[baselinevars].isnull().all(axis=1) & (
         df_hh.index.get_level_values(time) != "2019-11-01"
     )
-    df_empty = df_hh[condition].copy()
-    df_empty = df_empty.drop(baselinevars, axis=1).join(var)
-    df_nonempty = df_hh[~condition].copy()
-
-    df_hh = pd.concat([df_empty, df_nonempty], axis=0).sort_index()
+    df_hh.loc[condition, baselinevars] = baseline_values(
+        df_hh[baselinevars], baselinevars
+    ).loc[condition]
 
     # Fix workstatus baseline partner
     condition = df_hh.index.get_level_values("month") != "2019-11-01"
@@ -147,6 +107,88 @@ def generate_hh_level_data(
     return df_hh
 
 
+def merge_partner_columns(df, partner_id, time_constant, time="month"):
+    """Add the variables of the partner to each row of df.
+
+    Each row is mapped to the row of its partner in the same period once, and
+    the partner columns are gathered by position. Rows of persons that are
+    only observed through their partner in a period are added. The time
+    constant variables are taken from the first row of the partner.
+
+    Args:
+        df (pd.DataFrame): data set with index: personal_id and `time`.
+        partner_id (pd.Series): personal_id of the partner with index:
+            personal_id.
+        time_constant (list): variables taken from the first row of the
+            partner.
+        time (str): name of time index.
+
+    Return:
+        pd.DataFrame: df + personal_id_partner + columns with partner info
+            named as columnname_partner, sorted by the index.
+
+    """
+    n_obs = len(df)
+    person = df.index.get_level_values("personal_id").to_numpy()
+    period = df.index.get_level_values(time)
+    own_partner = partner_id.reindex(person).to_numpy(dtype=float)
+    has_partner = ~np.isnan(own_partner)
+
+    # Row of the partner in the same period if the partner links back
+    partner_row = np.full(n_obs, -1)
+    partner_row[has_partner] = df.index.get_indexer(
+        pd.MultiIndex.from_arrays([own_partner[has_partner], period[has_partner]])
+    )
+    links_back = partner_row >= 0
+    links_back[links_back] = own_partner[partner_row[links_back]] == person[links_back]
+    partner_row[~links_back] = -1
+
+    # Rows whose partner is not observed in the period are added for the partner
+    added = has_partner.copy()
+    added[partner_row[links_back]] = False
+    added_rows = np.flatnonzero(added)
+
+    index = pd.MultiIndex.from_arrays(
+        [
+            np.concatenate([person, own_partner[added_rows]]),
+            period.append(period[added_rows]),
+        ],
+        names=["personal_id", time],
+    )
+    own_row = np.concatenate([np.arange(n_obs), np.full(len(added_rows), -1)])
+    partner_row = np.concatenate([partner_row, added_rows])
+    personal_id_partner = np.concatenate([own_partner, person[added_rows]])
+
+    # First row of each person with a partner
+    first_row = (
+        pd.Series(np.arange(n_obs)[has_partner])
+        .groupby(person[has_partner])
+        .first()
+        .reindex(personal_id_partner)
+        .fillna(-1)
+        .to_numpy(dtype=int)
+    )
+
+    time_varying = [c for c in df.columns if c not in time_constant]
+    df_hh = pd.concat(
+        [
+            _take_rows(df, own_row),
+            pd.DataFrame({"personal_id_partner": personal_id_partner}),
+            _take_rows(df[time_varying], partner_row).add_suffix("_partner"),
+            _take_rows(df[time_constant], first_row).add_suffix("_partner"),
+        ],
+        axis=1,
+    )
+    df_hh.index = index
+
+    return df_hh.sort_index()
+
+
+def _take_rows(df, rows):
+    """Take rows of df by position, missing for position -1."""
+    return df.reset_index(drop=True).reindex(rows).reset_index(drop=True)
+
+
 def generate_vars_for_couples(hh_data):
     """Generate variables that rely on partner data."""
     df_hh = hh_data.copy()
@@ -755,29 +797,6 @@ def children_variables(df):
     return df
 
 
-def make_vars_time_invariant(df, cols):
-    df = df.reset_index().set_index("personal_id")
-
-    for col in cols:
-        time_invariant = df[col].copy()
-        time_invariant = time_invariant.dropna()
-
-        # Check for duplicates
-        double = time_invariant.index.duplicated()
-        if double.any():
-            warnings.warn(f"Duplicates in {col}, only one will be kept.")
-            # {time_invariant.loc[time_invariant.index.duplicated()]}s
-
-            time_invariant = time_invariant[~double]
-
-        # Join column in
-        df = df.drop(columns=col).join(time_invariant)
-
-    df = df.reset_index().set_index(["personal_id", "month"])
-
-    return df
-
-
 if __name__ == "__main__":
     # Load data
 
@@ -798,24 +817,8 @@ if __name__ == "__main__":
     out = out.sort_index()
 
     # Export long format
-    try:
-        out.to_parquet(ppj("OUT_DATA", "work-childcare-long.parquet"))
-    except:
-        colus = list(out.columns)
-        colus.remove("hours_workplace")
-        for col in colus:
-            try:
-                out[["hours_workplace", col]].to_parquet("test.parquet")
-            except:
-                if out[col].dtype.name == "category":
-                    out[col].cat.categories = [str(c) for c in out[col].cat.categories]
-                else:
-                    print(
-                        f"!! {col} has dtype {out[col].dtype} incompatible with parquet and is set to categorical"
-                    )
-                    out[col] = out[col].astype(str).astype("category")
-
-        out.to_parquet(path=ppj("OUT_DATA", "work-childcare-long.parquet"))
+    out = normalize_dtypes_for_parquet(out)
+    out.to_parquet(ppj("OUT_DATA", "work-childcare-long.parquet"))
 
     # Make wide format
     wide = out.unstack(1)
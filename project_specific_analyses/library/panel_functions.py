@@ -1,4 +1,55 @@
-"""Functions useful for variable generation in panel framework."""
+"""Functions useful for variable generation in panel framework.
+
+The panel is indexed by (personal_id, month). The functions align values to
+this index by level instead of switching the index of the panel.
+
+"""
+import pandas as pd
+
+
+def broadcast_person_values(values, index, level="personal_id"):
+    """Align values of each person to all periods of the panel.
+
+    Example: want to have the maximum of a variable over all months of a
+             person in each month.
+
+    Args:
+        values (pd.Series or pd.DataFrame): values indexed by personal_id
+        index (pd.MultiIndex): index of the panel
+        level (str): level of the panel index identifying a person
+
+    Return:
+        values with index *index*, missing for persons not in values
+
+    """
+    res = values.reindex(index.get_level_values(level))
+    res.index = index
+    return res
+
+
+def month_to_columns(df, var, months, names=None):
+    """Generate variables that contain the values of *var* in some months.
+
+    Example: want to have the value of applied_any_policy in May and in
+             September at all points in time.
+
+    Args:
+        df (pd.DataFrame)
+        var (str): name of the variable
+        months (list): months whose values are taken
+        names (list): names of the new variables, defaults to var followed
+                      by year and month
+
+    Return:
+        pd.DataFrame: one column for each month with the index of df
+
+    """
+    months = pd.to_datetime(months)
+    if names is None:
+        names = [f"{var}_{month:%Y_%m}" for month in months]
+    by_month = df[var].unstack("month").reindex(columns=months)
+    by_month.columns = names
+    return broadcast_person_values(by_month, df.index)
 
 
 def get_baseline(df, newvar, oldvar, baseline="2020-02-01"):
@@ -12,14 +63,95 @@ def get_baseline(df, newvar, oldvar, baseline="2020-02-01"):
         newvar (str): name of the variable to be generated
         oldvar (str): name of the variable out of which the new variable
                       shall be generated.
-        baseline (str): data of the baseline
+        baseline (str): month label of the baseline, e.g. "2020-02-01"
 
     Return:
         original dataframe + newvar
 
     """
-    base = df.index.get_level_values("month") == baseline
-    var = df.loc[base, oldvar].reset_index().set_index("personal_id").copy()
-    var.rename(columns={oldvar: newvar}, inplace=True)
-    var = var[newvar].copy()
-    return df.join(var)
+    return get_baselines(df, [oldvar], baseline=baseline, names=[newvar])
+
+
+def get_baselines(df, variables, baseline="2020-02-01", names=None, last=False):
+    """Generate variables that contain the baseline values of many variables.
+
+    Example: want to have variables that contain hours_total and not_working
+             from before Covid-19 at all points in time.
+
+    Args:
+        df (pd.DataFrame)
+        variables (list): variables out of which the new variables shall be
+                          generated
+        baseline (str or list): month label of the baseline, e.g.
+                                "2020-02-01", or a list with one label for
+                                each variable. A single month has to be
+                                passed as str, not as a Timestamp.
+        names (list): names of the new variables, defaults to the variables
+                      with suffix "_baseline"
+        last (bool): take the last non-missing value up to the baseline
+                     instead of the value at the baseline
+
+    Return:
+        original dataframe + new variables
+
+    """
+    if names is None:
+        names = [var + "_baseline" for var in variables]
+    values = baseline_values(df, variables, baseline=baseline, last=last)
+    values.columns = names
+    return pd.concat([df, values], axis=1)
+
+
+def baseline_values(df, variables, baseline="2020-02-01", last=False):
+    """Return the baseline values of *variables* aligned to all periods.
+
+    The variables with the same baseline are taken from one cross-section.
+
+    Args:
+        df (pd.DataFrame)
+        variables (list): variables whose baseline values are taken
+        baseline (str or list): month label of the baseline, e.g.
+                                "2020-02-01", or a list with one label for
+                                each variable. A single month has to be
+                                passed as str, not as a Timestamp.
+        last (bool): take the last non-missing value up to the baseline
+                     instead of the value at the baseline
+
+    Return:
+        pd.DataFrame: baseline values with the index of df and columns
+            variables
+
+    """
+    variables = list(variables)
+    if isinstance(baseline, str):
+        baseline = [baseline] * len(variables)
+    elif not isinstance(baseline, (list, tuple)) or len(baseline) != len(variables):
+        raise ValueError(
+            "baseline has to be a month label like '2020-02-01' or a list with "
+            f"one label for each of the {len(variables)} variables, got {baseline!r}."
+        )
+    months = df.index.get_level_values("month")
+
+    by_baseline = {}
+    for position, date in enumerate(baseline):
+        by_baseline.setdefault(pd.Timestamp(date), []).append(position)
+
+    parts = []
+    for date, positions in by_baseline.items():
+        cols = list(dict.fromkeys(variables[pos] for pos in positions))
+        if last:
+            values = (
+                df.loc[months <= date, cols]
+                .sort_index(level="month", sort_remaining=False)
+                .groupby(level="personal_id")
+                .last()
+            )
+        else:
+            values = df.loc[months == date, cols].droplevel("month")
+        values = values[[variables[pos] for pos in positions]]
+        parts.append(broadcast_person_values(values, df.index))
+
+    # Restore the order of the variables
+    order = [pos for positions in by_baseline.values() for pos in positions]
+    res = pd.concat(parts, axis=1)
+    return res.iloc[:, sorted(range(len(order)), key=order.__getitem__)]
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+from project_specific_analyses.data_management.merge_partner_info import (
+    merge_partner_columns,
+)
+
+
+def _merge_partner_columns_with_merges(df, partner_id, time_constant, time="month"):
+    """The former merges of generate_hh_level_data."""
+    partner_id = partner_id.to_frame()
+    df_reindex = df.reset_index()
+    df_w_partner_id = pd.merge(df_reindex, partner_id, on="personal_id", how="left")
+
+    df_partner = df_w_partner_id.copy()
+    ren = {}
+    for col in df_partner.columns:
+        if col not in [time]:
+            ren.update({col: col + "_partner"})
+    df_partner.rename(columns=ren, inplace=True)
+    df_partner.rename(
+        columns={"personal_id_partner_partner": "personal_id"}, inplace=True
+    )
+    df_partner = df_partner.dropna(subset=["personal_id"])
+
+    time_constant = [c + "_partner" for c in time_constant]
+    df_hh = pd.merge(
+        df_w_partner_id,
+        df_partner.drop(time_constant, axis=1),
+        on=["personal_id", "personal_id_partner", time],
+        how="outer",
+    )
+
+    df_constant = df_partner[time_constant + ["personal_id_partner"]].copy()
+    df_constant = df_constant[~df_constant.personal_id_partner.duplicated()]
+    df_hh = pd.merge(
+        df_hh,
+        df_constant,
+        how="left",
+        on=["personal_id_partner"],
+        validate="many_to_one",
+    )
+
+    df_hh.set_index(["personal_id", time], inplace=True)
+    return df_hh.sort_index()
+
+
+def _make_panel(seed, n_persons=200):
+    rng = np.random.default_rng(seed)
+    months = pd.to_datetime(["2019-11-01", "2020-02-01", "2020-03-01", "2020-04-01"])
+    persons = rng.choice(np.arange(800000, 900000), n_persons, replace=False)
+    index = pd.MultiIndex.from_product(
+        [persons, months], names=["personal_id", "month"]
+    )
+    # Unbalanced panel, in order of the data sets and not sorted
+    index = index[rng.random(len(index)) < 0.75]
+    n_obs = len(index)
+    df = pd.DataFrame(
+        {
+            "hours": np.where(rng.random(n_obs) < 0.2, np.nan, rng.random(n_obs)),
+            "n_children": rng.integers(0, 5, n_obs),
+            "female": rng.random(n_obs) > 0.5,
+            "work_status": pd.Categorical(
+                rng.choice(["working", "not working"], n_obs)
+            ),
+            "hours_baseline": rng.random(n_obs),
+            "education": pd.Categorical(rng.choice(["low", "high"], n_obs)),
+        },
+        index=index,
+    )
+    df.loc[rng.random(n_obs) < 0.2, "hours_baseline"] = np.nan
+
+    # Couples of persons in df and of persons with partners outside of df
+    everyone = np.concatenate([persons, np.arange(950000, 950040)])
+    rng.shuffle(everyone)
+    couples = everyone[: len(everyone) // 2 * 2].reshape(-1, 2)[: len(persons) // 3]
+    with_partner = np.concatenate([couples[:, 0], couples[:, 1]])
+    partners = np.concatenate([couples[:, 1], couples[:, 0]]).astype(float)
+
+    # Persons without partner or with a missing partner id
+    singles = np.setdiff1d(persons, with_partner)
+    missing_id = singles[:20]
+
+    # Persons who name someone who has another partner
+    other_partner = singles[20:30]
+    taken = with_partner[: len(other_partner)].astype(float)
+
+    partner_id = pd.Series(
+        np.concatenate([partners, np.full(len(missing_id), np.nan), taken]),
+        index=pd.Index(
+            np.concatenate([with_partner, missing_id, other_partner]),
+            name="personal_id",
+        ),
+        name="personal_id_partner",
+    )
+    return df.sample(frac=1, random_state=seed), partner_id
+
+
+def _sort_rows(df):
+    """Sort rows of the same person and month by the partner id."""
+    return (
+        df.set_index("personal_id_partner", append=True)
+        .sort_index()
+        .reset_index("personal_id_partner")
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_merge_partner_columns_equals_merges(seed):
+    df, partner_id = _make_panel(seed)
+    time_constant = ["hours_baseline", "education"]
+
+    expected = _merge_partner_columns_with_merges(df, partner_id, time_constant)
+    result = merge_partner_columns(df, partner_id, time_constant)
+
+    # Persons named by someone who is not their partner get an additional row
+    # in each month of that person
+    assert not result.index.is_unique
+    assert result["personal_id_partner"].isna().any()
+
+    expected = _sort_rows(expected)
+    result = _sort_rows(result)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from project_specific_analyses.library.panel_functions import baseline_values
+from project_specific_analyses.library.panel_functions import get_baseline
+from project_specific_analyses.library.panel_functions import get_baselines
+
+
+def _get_baseline_with_join(df, newvar, oldvar, baseline="2020-02-01"):
+    """The former get_baseline which joined the baseline on personal_id."""
+    base = df.index.get_level_values("month") == baseline
+    var = df.loc[base, oldvar].reset_index().set_index("personal_id").copy()
+    var.rename(columns={oldvar: newvar}, inplace=True)
+    var = var[newvar].copy()
+    return df.join(var)
+
+
+@pytest.fixture
+def panel():
+    """Unbalanced panel, person 3 is not observed in 2020-02."""
+    months = pd.to_datetime(["2020-02-01", "2020-03-01", "2020-04-01"])
+    index = pd.MultiIndex.from_tuples(
+        [(1, months[0]), (1, months[1]), (1, months[2])]
+        + [(2, months[2]), (2, months[0])]
+        + [(3, months[1]), (3, months[2])],
+        names=["personal_id", "month"],
+    )
+    return pd.DataFrame(
+        {
+            "hours": [40.0, 30.0, np.nan, 20.0, 10.0, 5.0, 8.0],
+            "working": [True, True, False, True, False, True, True],
+        },
+        index=index,
+    )
+
+
+@pytest.mark.parametrize("month", ["2020-02-01", "2020-03-01"])
+def test_get_baseline_equals_join(panel, month):
+    expected = _get_baseline_with_join(panel, "hours_baseline", "hours", month)
+    result = get_baseline(panel, "hours_baseline", "hours", baseline=month)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_baseline_values_with_one_month_per_variable(panel):
+    result = baseline_values(
+        panel,
+        ["hours", "working", "hours"],
+        baseline=["2020-03-01", "2020-02-01", "2020-02-01"],
+    )
+    expected = pd.concat(
+        [
+            get_baseline(panel, "a", "hours", "2020-03-01")["a"],
+            get_baseline(panel, "b", "working", "2020-02-01")["b"],
+            get_baseline(panel, "c", "hours", "2020-02-01")["c"],
+        ],
+        axis=1,
+    )
+    expected.columns = ["hours", "working", "hours"]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_get_baselines_takes_last_value_up_to_baseline(panel):
+    result = get_baselines(panel, ["hours"], baseline="2020-03-01", last=True)
+    expected = pd.Series(
+        [30.0, 30.0, 30.0, 10.0, 10.0, 5.0, 5.0],
+        index=panel.index,
+        name="hours_baseline",
+    )
+    pd.testing.assert_series_equal(result["hours_baseline"], expected)
+
+
+@pytest.mark.parametrize(
+    "baseline", [pd.Timestamp("2020-02-01"), ["2020-02-01", "2020-03-01"]]
+)
+def test_baseline_values_requires_month_labels(panel, baseline):
+    with pytest.raises(ValueError, match="month label"):
+        baseline_values(panel, ["hours"], baseline=baseline)
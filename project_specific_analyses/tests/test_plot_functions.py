@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from project_specific_analyses.analysis.plot_functions import _weight_cols
+
+
+def _weight_cols_group_by_group(data, cols, weight_col, other_cols, by):
+    """The former _weight_cols which normalized the weights group by group."""
+    d = data.dropna(subset=cols + [weight_col] + other_cols + by)
+    out = d[cols].multiply(d[weight_col], axis="index")
+    out[by + [weight_col]] = d[by + [weight_col]]
+
+    chunks_by_by = []
+    for row in out.reset_index()[by].drop_duplicates().dropna().iterrows():
+        temp = out.copy()
+        for by_var in by:
+            temp = temp.loc[temp[by_var] == row[1][by_var]]
+        norm = temp[weight_col].sum() / len(temp[weight_col])
+        temp[cols] = temp[cols] / norm
+        chunks_by_by.append(temp)
+
+    out = pd.concat(chunks_by_by)
+    out[other_cols] = d[other_cols]
+    return out[cols + other_cols + by].sort_index()
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 400
+    index = pd.MultiIndex.from_arrays(
+        [np.arange(n) // 4, np.tile(["2020-03", "2020-04", "2020-05", "2020-06"], 100)],
+        names=["personal_id", "month"],
+    )
+    df = pd.DataFrame(
+        {
+            "hours": np.where(rng.random(n) < 0.1, np.nan, rng.random(n) * 40),
+            "income": rng.random(n) * 3000,
+            "weight": np.where(rng.random(n) < 0.1, np.nan, rng.random(n) * 2),
+            "gender": pd.Categorical(
+                rng.choice(["men", "women", None], n), categories=["men", "women", "x"]
+            ),
+            "age_group": rng.choice([1.0, 2.0, 3.0, np.nan], n),
+        },
+        index=index,
+    )
+    df["month_col"] = df.index.get_level_values("month")
+
+    # Weights are missing for all members of one group and zero in another
+    df.loc[df["age_group"] == 3, "weight"] = np.nan
+    df.loc[(df["age_group"] == 2) & (df["month_col"] == "2020-04"), "weight"] = 0
+    return df
+
+
+@pytest.mark.parametrize(
+    "by, other_cols",
+    [
+        (["month_col"], []),
+        (["month_col", "gender"], ["income"]),
+        (["gender", "age_group"], []),
+        (["month_col", "age_group"], ["income"]),
+    ],
+)
+def test_weight_cols_equals_group_by_group(data, by, other_cols):
+    cols = ["hours"]
+    expected = _weight_cols_group_by_group(data, cols, "weight", other_cols, by)
+    result = _weight_cols(data, cols, "weight", other_cols, by=by)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_weight_cols_drops_groups_without_weights(data):
+    result = _weight_cols(data, ["hours"], "weight", [], by=["age_group"])
+    assert set(result["age_group"]) == {1.0, 2.0}
+    assert (result["hours"] >= 0).all()